@@ -1,22 +1,35 @@
-from flask import Flask, render_template, request, send_file
+from flask import Flask, Response, render_template, request, send_file, send_from_directory, url_for
 from werkzeug.utils import secure_filename
-from backend import GeneHandler, PathwayGenerator
+from backend import (
+    ExpressionTable, GeneHandler, ImageDerivatives, JobArchive, KeggTables, OrthologyMapper, PathwayGenerator,
+    ProgressTracker, ReactionQuery
+)
+from collections import Counter
 import os
+import csv
 import glob
+import json
+import threading
+import time
+import uuid
 
-# Initialize the Flask app
-app = Flask(__name__, template_folder="templates")
-
-# Ensure the "uploads" and "output" folders exist
+# The "uploads", "output" and "cache" folders (next to this script unless KEGG_DATA_FOLDER is set)
 script_dir = os.path.dirname(os.path.abspath(__file__))
-uploads_folder = os.path.join(script_dir, "uploads")
-output_folder = os.path.join(script_dir, "output")
+data_folder = os.environ.get("KEGG_DATA_FOLDER", script_dir)
+uploads_folder = os.path.join(data_folder, "uploads")
+output_folder = os.path.join(data_folder, "output")
+cache_folder = os.path.join(data_folder, "cache")
+
+# Progress trackers of running and recently finished jobs, keyed by job ID
+jobs = {}
+
+# Thumbnails and mid-size versions of the pathway maps
+image_derivatives = ImageDerivatives(output_folder)
 
-os.makedirs(uploads_folder, exist_ok=True)
-os.makedirs(output_folder, exist_ok=True)
+# Species offered in the KEGG tool dropdown, preloaded during warm-up
+SPECIES = ["hsa", "mmu", "rno", "eco", "sce"]
 
 
-@app.route("/")
 def kegg_home():
     """Homepage with a list of questions about biological pathways."""
     questions = [
@@ -29,106 +42,373 @@ def kegg_home():
     return render_template("home.html", questions=questions)
 
 
-@app.route('/about')
 def about():
     """About page with details about the project and tools used."""
     return render_template('about.html')
 
 
-@app.route('/contact')
 def contact():
     """Contact page with team details."""
     return render_template('contact.html')
 
 
-@app.route("/kegg_tool", methods=["GET", "POST"])
+def write_table(path, header, rows):
+    """Writes rows to a tab-separated file with a header line."""
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f, delimiter="\t")
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def run_gene_job(tracker, job_folder, gene_list, species, target_species):
+    """
+    Maps genes (and optionally their orthologs) to pathways and saves the pathway maps,
+    reporting progress to the job's tracker.
+    """
+    try:
+        # Map genes to KEGG IDs
+        gene_handler = GeneHandler(gene_list, species, progress=tracker)
+        ortholog_ids = []
+        ortholog_rows = []
+        if target_species:
+            # Orthology mode: map the whole gene list to every target species in one pass
+            orthology_mapper = OrthologyMapper(gene_list, species, target_species, progress=tracker)
+            orthologs = orthology_mapper.map_orthologs()
+            gene_to_kegg = {gene: mapping["kegg_id"] for gene, mapping in orthologs.items()}
+            for gene, mapping in orthologs.items():
+                for target, target_ids in mapping["orthologs"].items():
+                    ortholog_ids.extend(target_ids)
+                    ortholog_rows.extend((gene, target_id, target) for target_id in target_ids)
+        else:
+            gene_to_kegg = gene_handler.get_kegg_ids()
+
+        if not gene_to_kegg:
+            raise ValueError("No KEGG IDs found for the provided genes.")
+
+        mapping_rows = [(gene, kegg_id, species) for gene, kegg_id in gene_to_kegg.items()] + ortholog_rows
+        write_table(os.path.join(job_folder, "gene_to_kegg.tsv"), ["gene", "kegg_id", "species"], mapping_rows)
+
+        # Retrieve pathways for each KEGG ID (and its orthologs)
+        kegg_ids = list(gene_to_kegg.values()) + ortholog_ids
+        if target_species:
+            # One bulk link table per species instead of one request per ortholog
+            kegg_to_pathways = orthology_mapper.get_pathway_ids(kegg_ids)
+        else:
+            kegg_to_pathways = gene_handler.get_pathway_ids(kegg_ids)
+        # Pathway names of every species, downloaded on first use if warm-up skipped them
+        tables = KeggTables()
+        pathway_names = {}
+        for prefix in sorted({kegg_id.split(":")[0] for kegg_id in kegg_to_pathways}):
+            try:
+                pathway_names.update(tables.get_pathway_names(prefix))
+            except Exception:
+                pass  # KEGG did not serve the list; the names of this species stay empty
+        write_table(
+            os.path.join(job_folder, "pathways.tsv"),
+            ["kegg_id", "pathway_id", "pathway_name"],
+            [
+                (kegg_id, pathway_id, pathway_names.get(pathway_id, ""))
+                for kegg_id, pathways in kegg_to_pathways.items()
+                for pathway_id in pathways
+            ],
+        )
+
+        # Generate pathway maps (one map per KEGG ID for its first associated pathway)
+        pathway_genes = {}
+        for kegg_id, pathways in kegg_to_pathways.items():
+            if pathways:
+                pathway_genes.setdefault(pathways[0], []).append(kegg_id)
+        saved_files = PathwayGenerator(progress=tracker).save_pathways(pathway_genes, job_folder)
+        for file_name in saved_files:
+            image_derivatives.schedule(os.path.join(job_folder, file_name))
+
+        message = f"Pathway maps generated successfully for the following genes: {', '.join(gene_list)}"
+        if target_species:
+            message += f" ({len(ortholog_ids)} orthologs found in {', '.join(target_species)})"
+        tracker.emit("done", message=message)
+    except Exception as e:
+        tracker.emit("error", message=f"Error: {str(e)}")
+
+
+def run_expression_job(tracker, job_folder, file_path, species, sample):
+    """
+    Colors the pathways that contain the most measured genes by expression value,
+    reporting progress to the job's tracker.
+    """
+    try:
+        expression_table = ExpressionTable.from_file(file_path, cache_folder=cache_folder)
+        gene_values = expression_table.to_kegg(species, sample or None)
+        if not gene_values:
+            raise ValueError("No genes in the expression table could be matched to KEGG IDs.")
+        tracker.emit("genes", completed=len(gene_values), total=len(gene_values), mapped=len(gene_values))
+        write_table(os.path.join(job_folder, "gene_to_kegg.tsv"), ["kegg_id", "value"], gene_values.items())
+
+        gene_to_pathways = KeggTables().get_links("pathway", species)
+        pathway_counts = Counter(
+            pathway for kegg_id in gene_values for pathway in gene_to_pathways.get(kegg_id, [])
+        )
+        write_table(
+            os.path.join(job_folder, "pathways.tsv"),
+            ["pathway_id", "measured_genes"],
+            [(pathway.replace("path:", ""), count) for pathway, count in pathway_counts.most_common()],
+        )
+        pathway_genes = {pathway.replace("path:", ""): list(gene_values) for pathway, _ in pathway_counts.most_common(5)}
+        tracker.emit("pathways", completed=len(pathway_genes), total=len(pathway_genes))
+
+        saved_files = PathwayGenerator(progress=tracker).save_pathways(pathway_genes, job_folder, gene_values)
+        for file_name in saved_files:
+            image_derivatives.schedule(os.path.join(job_folder, file_name))
+
+        tracker.emit(
+            "done",
+            message=f"Expression values of {len(gene_values)} genes were mapped onto {len(pathway_genes)} pathway maps",
+        )
+    except Exception as e:
+        tracker.emit("error", message=f"Error: {str(e)}")
+
+
+def run_reaction_job(tracker, job_folder, identifiers):
+    """
+    Resolves compound, EC and KO identifiers to reactions and pathways and saves
+    the pathway maps shared by most identifiers, reporting progress to the job's tracker.
+    """
+    try:
+        reaction_query = ReactionQuery(identifiers, progress=tracker)
+        if not reaction_query.identifiers:
+            raise ValueError("No compound (C00031), EC (2.7.1.1) or KO (K00844) identifiers found.")
+
+        resolved = reaction_query.resolve()
+        pathway_names = KeggTables().get_pathway_names()
+
+        reaction_rows = []
+        pathway_identifiers = {}
+        for identifier, mapping in resolved.items():
+            for reaction, pathways in mapping["pathways"].items():
+                reaction_rows.extend((identifier, reaction, pathway) for pathway in pathways or [""])
+                for pathway in pathways:
+                    pathway_identifiers.setdefault(pathway, set()).add(identifier)
+        write_table(os.path.join(job_folder, "reactions.tsv"), ["identifier", "reaction", "pathway_id"], reaction_rows)
+
+        # Pathways that involve the most identifiers come first
+        ranked_pathways = sorted(pathway_identifiers, key=lambda pathway: (-len(pathway_identifiers[pathway]), pathway))
+        write_table(
+            os.path.join(job_folder, "pathways.tsv"),
+            ["pathway_id", "pathway_name", "identifiers"],
+            [
+                (pathway, pathway_names.get(pathway, ""), ", ".join(sorted(pathway_identifiers[pathway])))
+                for pathway in ranked_pathways
+            ],
+        )
+        tracker.emit("pathways", completed=len(ranked_pathways), total=len(ranked_pathways))
+
+        pathway_genes = {pathway: [] for pathway in ranked_pathways[:5]}
+        saved_files = PathwayGenerator(progress=tracker).save_pathways(pathway_genes, job_folder)
+        for file_name in saved_files:
+            image_derivatives.schedule(os.path.join(job_folder, file_name))
+
+        reaction_count = len({reaction for mapping in resolved.values() for reaction in mapping["reactions"]})
+        message = (
+            f"Found {reaction_count} reactions in {len(ranked_pathways)} pathways "
+            f"for the following identifiers: {', '.join(resolved)}"
+        )
+        if reaction_query.unrecognized:
+            message += f" (not recognized: {', '.join(reaction_query.unrecognized)})"
+        tracker.emit("done", message=message)
+    except Exception as e:
+        tracker.emit("error", message=f"Error: {str(e)}")
+
+
+def start_job(target, *args, job_id=None):
+    """
+    Runs a KEGG job in a background thread with its own output folder and progress tracker.
+
+    Args:
+        target (callable): Job function, called with the tracker, the job folder and args.
+        job_id (str): Identifier to use, when the request already reserved one for its uploads.
+
+    Returns:
+        str: The identifier of the new job.
+    """
+    # Forget finished jobs after an hour; their files stay in the output folder
+    for old_id, old_tracker in list(jobs.items()):
+        if old_tracker.done and time.time() - old_tracker.finished_at > 3600:
+            jobs.pop(old_id, None)
+
+    job_id = job_id or uuid.uuid4().hex
+    job_folder = os.path.join(output_folder, job_id)
+    os.makedirs(job_folder, exist_ok=True)
+
+    # The log lets other worker processes stream this job's progress
+    tracker = ProgressTracker(job_id, log_path=os.path.join(job_folder, "progress.jsonl"))
+    jobs[job_id] = tracker
+    threading.Thread(target=target, args=(tracker, job_folder, *args), daemon=True).start()
+    return job_id
+
+
+def save_upload(uploaded_file, job_id):
+    """
+    Saves an uploaded file in a folder of its own job, so concurrent uploads never overwrite each other.
+
+    Args:
+        uploaded_file (FileStorage): The uploaded file.
+        job_id (str): Identifier of the job the upload belongs to.
+
+    Returns:
+        str: Path of the saved file.
+    """
+    upload_folder = os.path.join(uploads_folder, job_id)
+    os.makedirs(upload_folder, exist_ok=True)
+    file_path = os.path.join(upload_folder, secure_filename(uploaded_file.filename) or "upload")
+    uploaded_file.save(file_path)
+    return file_path
+
+
 def kegg_tool():
     """
-    Handles input from the KEGG Tool page and interacts with the backend
+    Handles input from the KEGG Tool page and starts a background job
     to find pathways and generate pathway maps.
     """
     result = None
     error = None
+    job_id = None
 
     if request.method == "POST":
         genes_input = request.form.get("genes")  # Text input field for genes
         species = request.form.get("species")  # Species dropdown
         uploaded_file = request.files.get("gene_file")  # File upload field
+        target_species = request.form.getlist("target_species")  # Orthology checkboxes
+        expression_file = request.files.get("expression_file")  # Expression table upload
+        sample = request.form.get("sample")  # Expression column to color by
+        identifiers_input = request.form.get("identifiers")  # Compound, EC and KO identifiers
+        upload_id = uuid.uuid4().hex  # Reserved job identifier, also used to keep uploads apart
 
         try:
-            # Validate species selection
-            if not species:
+            if identifiers_input and identifiers_input.strip():
+                # Reaction mode: works on the reference pathways, so no species is needed
+                identifiers = [identifier.strip() for identifier in identifiers_input.split(",") if identifier.strip()]
+                job_id = start_job(run_reaction_job, identifiers)
+            elif not species:
+                # Validate species selection
                 raise ValueError("No species selected. Please choose a species.")
+            elif expression_file and expression_file.filename:
+                # Expression mode: the upload is saved now, the table is parsed by the job
+                file_path = save_upload(expression_file, upload_id)
+
+                job_id = start_job(run_expression_job, file_path, species, sample, job_id=upload_id)
+            else:
+                # Process the input genes
+                gene_list = []
+                if genes_input:
+                    # Split input genes by commas
+                    gene_list = [gene.strip() for gene in genes_input.split(",")]
+                elif uploaded_file:
+                    # Save the uploaded file and read the gene list from it
+                    file_path = save_upload(uploaded_file, upload_id)
+
+                    # Read the file line by line to get gene names
+                    with open(file_path, "r") as f:
+                        gene_list = [line.strip() for line in f.readlines()]
+
+                if not gene_list:
+                    raise ValueError("No genes provided. Please enter genes or upload a file.")
+
+                job_id = start_job(run_gene_job, gene_list, species, target_species, job_id=upload_id)
+
+            result = "Your job has started. Pathway maps are listed below as soon as they are ready."
+        except Exception as e:
+            error = f"Error: {str(e)}"
 
-            # Process the input genes
-            gene_list = []
-            if genes_input:
-                # Split input genes by commas
-                gene_list = [gene.strip() for gene in genes_input.split(",")]
-            elif uploaded_file:
-                # Save the uploaded file and read the gene list from it
-                filename = secure_filename(uploaded_file.filename)
-                file_path = os.path.join(uploads_folder, filename)
-                uploaded_file.save(file_path)
-
-                # Read the file line by line to get gene names
-                with open(file_path, "r") as f:
-                    gene_list = [line.strip() for line in f.readlines()]
-
-            if not gene_list:
-                raise ValueError("No genes provided. Please enter genes or upload a file.")
-
-            # Map genes to KEGG IDs
-            gene_handler = GeneHandler(gene_list, species)
-            gene_to_kegg = gene_handler.get_kegg_ids()
+    return render_template("kegg_tool.html", result=result, error=error, job_id=job_id)
+
+
+def job_progress(job_id):
+    """Streams the progress events of a job as Server-Sent Events."""
+    tracker = jobs.get(job_id)
+    if tracker is not None:
+        events = tracker.iter_events()
+    else:
+        # The job may run in another worker process; follow its progress log instead
+        log_path = os.path.join(output_folder, secure_filename(job_id), "progress.jsonl")
+        if not os.path.isfile(log_path):
+            return "Unknown job.", 404
+        events = ProgressTracker.follow(log_path)
+
+    def stream():
+        for event in events:
+            if event is None:
+                yield ": keep-alive\n\n"  # Comment line keeps proxies from closing the stream
+            else:
+                yield f"event: {event['stage']}\ndata: {json.dumps(event)}\n\n"
+
+    return Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-            if not gene_to_kegg:
-                raise ValueError("No KEGG IDs found for the provided genes.")
 
-            # Retrieve pathways for each KEGG ID
-            kegg_ids = list(gene_to_kegg.values())
-            kegg_to_pathways = gene_handler.get_pathway_ids(kegg_ids)
+def job_file(job_id, filename):
+    """Serves a file produced by a job, so maps can be viewed while the job is still running."""
+    return send_from_directory(os.path.join(output_folder, secure_filename(job_id)), filename)
 
-            # Generate pathway maps (one map per KEGG ID for its first associated pathway)
-            pathway_generator = PathwayGenerator()
-            for kegg_id, pathways in kegg_to_pathways.items():
-                if pathways:
-                    pathway_id = pathways[0]  # Use the first pathway ID for each KEGG ID
-                    pathway_generator.save_pathway(pathway_id, [kegg_id], output_folder)
 
-            result = f"Pathway maps generated successfully for the following genes: {', '.join(gene_list)}"
-        except Exception as e:
-            error = f"Error: {str(e)}"
+def job_thumbnail(job_id, size, filename):
+    """Serves a thumbnail or mid-size version of a pathway map, creating it on first request."""
+    image_path = os.path.join(output_folder, secure_filename(job_id), secure_filename(filename))
+    if size not in ImageDerivatives.SIZES or not filename.endswith(".png") or not os.path.isfile(image_path):
+        return "Image not found.", 404
+
+    derived_path = image_derivatives.get(image_path, size)
+    # Maps do not change after a job has saved them, so browsers may cache them for a day
+    return send_file(derived_path, mimetype="image/png", max_age=86400, conditional=True)
+
+
+def download_job(job_id):
+    """Streams every pathway map and result table of a job as a ZIP archive."""
+    job_id = secure_filename(job_id)
+    job_folder = os.path.join(output_folder, job_id)
+    if not job_id or not os.path.isdir(job_folder):
+        return "Unknown job.", 404
 
-    return render_template("kegg_tool.html", result=result, error=error)
+    return Response(
+        JobArchive(job_folder).iter_chunks(),
+        mimetype="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=kegg_job_{job_id}.zip"},
+    )
 
 
-@app.route("/pathway")
 def generated_image_pathway():
     """Shows the most recent KEGG pathway image on a new page."""
     # Find the latest PNG file in the output directory
     png_files = sorted(
-        glob.glob(os.path.join(output_folder, "*.png")),
+        glob.glob(os.path.join(output_folder, "*", "*.png")),
         key=os.path.getmtime,
         reverse=True
     )
 
-    # Get the path to the most recent PNG file
+    # Get the path to the most recent PNG file and the other maps of its job
     image_path = None
+    latest = None
+    gallery = []
     if png_files:
-        image_path = f"/output{os.path.basename(png_files[0])}"  # Use the output route
+        job_folder, file_name = os.path.split(png_files[0])
+        job_id = os.path.basename(job_folder)
+        image_path = url_for("job_file", job_id=job_id, filename=file_name)  # Use the output route
+        latest = (job_id, file_name)
+        gallery = [
+            (job_id, os.path.basename(path)) for path in sorted(glob.glob(os.path.join(job_folder, "*.png")))
+        ]
 
-    # Render the template with the image path
-    return render_template("pathway.html", image_path=image_path)
+    # Render the template with the image path and the thumbnails of the job
+    return render_template("pathway.html", image_path=image_path, latest=latest, gallery=gallery)
 
 
-@app.route("/latest_image")
 def latest_image():
     """Serves the most recent KEGG pathway image as a file stream."""
     try:
         # Find the latest PNG file in the output directory
         png_files = sorted(
-            glob.glob(os.path.join(output_folder, "*.png")),
+            glob.glob(os.path.join(output_folder, "*", "*.png")),
             key=os.path.getmtime,
             reverse=True
         )
@@ -145,5 +425,56 @@ def latest_image():
         return f"Error: {str(e)}", 500
 
 
+def create_app(warm_up=None):
+    """
+    Creates the Flask app and warms it up before it accepts traffic.
+
+    Warm-up loads the symbol index, gene-pathway links and pathway names of every
+    dropdown species into the shared KEGG table cache, so the first request is as
+    fast as later ones. The warm_up argument (or the KEGG_WARM_UP environment
+    variable) chooses between 'cache' (default: only tables already in the local
+    cache folder), 'download' (also download missing tables) and 'off'.
+    """
+    app = Flask(__name__, template_folder="templates")
+
+    # Register the pages and endpoints
+    app.add_url_rule("/", view_func=kegg_home)
+    app.add_url_rule("/about", view_func=about)
+    app.add_url_rule("/contact", view_func=contact)
+    app.add_url_rule("/kegg_tool", view_func=kegg_tool, methods=["GET", "POST"])
+    app.add_url_rule("/progress/<job_id>", view_func=job_progress)
+    app.add_url_rule("/output/<job_id>/<filename>", view_func=job_file)
+    app.add_url_rule("/thumbnail/<job_id>/<size>/<filename>", view_func=job_thumbnail)
+    app.add_url_rule("/download/<job_id>", view_func=download_job)
+    app.add_url_rule("/pathway", view_func=generated_image_pathway)
+    app.add_url_rule("/latest_image", view_func=latest_image)
+
+    # Ensure the data folders exist
+    os.makedirs(uploads_folder, exist_ok=True)
+    os.makedirs(output_folder, exist_ok=True)
+    os.makedirs(cache_folder, exist_ok=True)
+
+    # Downloaded KEGG tables are kept in the cache folder and shared by all workers
+    KeggTables.cache_folder = cache_folder
+
+    warm_up = warm_up or os.environ.get("KEGG_WARM_UP", "cache")
+    if warm_up != "off":
+        start = time.time()
+        tables = KeggTables()
+        loaded = tables.preload(SPECIES, download=warm_up == "download")
+        loaded += tables.preload_reactions(download=warm_up == "download")
+        app.logger.info("Warm-up loaded %d KEGG tables in %.1f s", len(loaded), time.time() - start)
+
+    @app.cli.command("warm-cache")
+    def warm_cache():
+        """Downloads the KEGG tables of all dropdown species and the reaction tables into the local cache."""
+        tables = KeggTables()
+        loaded = tables.preload(SPECIES, download=True) + tables.preload_reactions(download=True)
+        print(f"{len(loaded)} KEGG tables are cached in {cache_folder}")
+
+    return app
+
+
+# `flask run` and gunicorn call create_app() themselves, so importing this module has no side effects
 if __name__ == '__main__':
-    app.run(debug=True)
+    create_app().run(debug=True)
@@ -1,6 +1,174 @@
 import os
+import csv
+import glob
+import gzip
+import hashlib
+import json
+import re
+import tempfile
+import zipfile
 import time
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import requests
+from PIL import Image, ImageDraw
+
+# The KEGG REST API and the pause after every per-item request; both can be changed
+# through the environment, e.g. to run against a local KEGG stand-in
+KEGG_BASE_URL = os.environ.get("KEGG_BASE_URL", "http://rest.kegg.jp")
+KEGG_REQUEST_DELAY = float(os.environ.get("KEGG_REQUEST_DELAY", "5"))
+
+
+def _replace_atomically(path, write):
+    """
+    Writes a file through a uniquely named temporary file in the same folder and moves it into place,
+    so other threads and worker processes never read a half-written file.
+
+    Args:
+        path (str): Final path of the file.
+        write (callable): Function that writes the contents to a binary file object.
+    """
+    descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as f:
+            write(f)
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+
+class ProgressTracker:
+    """
+    A class to collect the progress events of one KEGG job so they can be streamed to the browser.
+
+    Events are dictionaries with a "stage" key ('genes', 'reactions', 'pathways',
+    'images', 'done' or 'error'). Events that carry "completed" and "total" counts also
+    get an "eta" in seconds for the remainder of their stage. With a log path,
+    every event is also appended to a JSON-lines file, so worker processes that
+    do not run the job can still stream its progress.
+
+    Attributes:
+        job_id (str): Identifier of the job.
+        log_path (str): JSON-lines file the events are appended to (optional).
+        events (list): Progress events in the order they were emitted.
+        done (bool): Whether the job has finished, successfully or not.
+        finished_at (float): Time the job finished (None while running).
+    """
+
+    def __init__(self, job_id, log_path=None):
+        """
+        Initialize ProgressTracker for a job.
+
+        Args:
+            job_id (str): Identifier of the job.
+            log_path (str): JSON-lines file the events are appended to (optional).
+        """
+        self.job_id = job_id
+        self.log_path = log_path
+        self.events = []
+        self.done = False
+        self.finished_at = None
+        self._last_event_time = time.time()
+        self._stage_started = {}
+        self._condition = threading.Condition()
+
+    def emit(self, stage, **data):
+        """
+        Records a progress event and wakes up every listener.
+
+        Args:
+            stage (str): Stage of the job ('genes', 'reactions', 'pathways', 'images', 'done' or 'error').
+            **data: Extra event fields, such as completed, total, file or message.
+        """
+        with self._condition:
+            now = time.time()
+            # A stage starts when the previous event was emitted
+            stage_started = self._stage_started.setdefault(stage, self._last_event_time)
+            completed, total = data.get("completed"), data.get("total")
+            if completed and total:
+                data["eta"] = round((now - stage_started) / completed * (total - completed), 1)
+
+            self.events.append({"stage": stage, **data})
+            if self.log_path:
+                with open(self.log_path, "a") as f:
+                    f.write(json.dumps(self.events[-1]) + "\n")
+            self._last_event_time = now
+            if stage in ("done", "error"):
+                self.done = True
+                self.finished_at = now
+            self._condition.notify_all()
+
+    def iter_events(self, timeout=15):
+        """
+        Yields all events of the job, from the first one, until the job has finished.
+
+        Args:
+            timeout (float): Seconds to wait for a new event before yielding None as a keep-alive.
+
+        Yields:
+            dict: The next progress event, or None when no event arrived within the timeout.
+        """
+        index = 0
+        while True:
+            with self._condition:
+                if index >= len(self.events) and not self.done:
+                    self._condition.wait(timeout)
+                new_events = self.events[index:]
+                done = self.done
+            index += len(new_events)
+
+            if not new_events:
+                yield None
+            yield from new_events
+
+            if done and index >= len(self.events):
+                return
+
+    @staticmethod
+    def follow(log_path, timeout=15, poll_interval=0.5, max_idle=600):
+        """
+        Yields the events of a job from its log file, for jobs run by another worker process.
+
+        Args:
+            log_path (str): JSON-lines file the job appends its events to.
+            timeout (float): Seconds without a new event before yielding None as a keep-alive.
+            poll_interval (float): Seconds between checks for new lines.
+            max_idle (float): Seconds without a new line after which the job is reported as failed,
+                for jobs whose worker died before writing a done or error event.
+
+        Yields:
+            dict: The next progress event, or None when no event arrived within the timeout.
+        """
+        position = 0
+        pending = ""
+        last_event_time = time.time()
+        last_line_time = last_event_time
+        while True:
+            with open(log_path, "r") as f:
+                f.seek(position)
+                pending += f.read()
+                position = f.tell()
+
+            # Only complete lines are parsed; a line that is still being written stays pending
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                event = json.loads(line)
+                last_event_time = last_line_time = time.time()
+                yield event
+                if event["stage"] in ("done", "error"):
+                    return
+
+            if time.time() - last_line_time >= max_idle:
+                yield {"stage": "error", "message": "The job stopped reporting progress."}
+                return
+            if time.time() - last_event_time >= timeout:
+                last_event_time = time.time()
+                yield None
+            time.sleep(poll_interval)
 
 
 class GeneHandler:
@@ -11,19 +179,22 @@ class GeneHandler:
         genes (list): List of gene names provided by the user.
         species (str): Species code (e.g., 'hsa' for humans).
         base_url (str): Base URL for the KEGG REST API.
+        progress (ProgressTracker): Receives progress events (optional).
     """
 
-    def __init__(self, genes, species):
+    def __init__(self, genes, species, progress=None):
         """
         Initialize GeneHandler with genes and species information.
 
         Args:
             genes (list): List of genes provided by the user.
             species (str): Species code (e.g., 'hsa' for humans).
+            progress (ProgressTracker): Receives progress events (optional).
         """
         self.genes = genes
         self.species = species
-        self.base_url = "http://rest.kegg.jp"
+        self.base_url = KEGG_BASE_URL
+        self.progress = progress
 
     def get_kegg_ids(self):
         """
@@ -32,21 +203,33 @@ class GeneHandler:
         Returns:
             dict: A dictionary where keys are gene names and values are KEGG IDs.
         """
+        # One bulk symbol index answers most genes; it is downloaded on first use if warm-up skipped it
+        try:
+            symbol_index = KeggTables().get_symbol_index(self.species)
+        except Exception:
+            symbol_index = {}  # KEGG did not serve the table; look the genes up one by one
+
         gene_to_kegg = {}
-        for gene in self.genes:
-            try:
-                url = f"{self.base_url}/find/genes/{gene}"
-                response = requests.get(url)
-                time.sleep(5)  # Avoid overwhelming the KEGG server
-
-                if response.status_code == 200:
-                    for line in response.text.split("\n"):
-                        if line.startswith(f"{self.species}:"):
-                            kegg_id = line.split("\t")[0]
-                            gene_to_kegg[gene] = kegg_id
-                            break
-            except Exception:
-                continue
+        for completed, gene in enumerate(self.genes, start=1):
+            if gene.upper() in symbol_index:
+                gene_to_kegg[gene] = symbol_index[gene.upper()]
+            else:
+                try:
+                    url = f"{self.base_url}/find/genes/{gene}"
+                    response = requests.get(url)
+                    time.sleep(KEGG_REQUEST_DELAY)  # Avoid overwhelming the KEGG server
+
+                    if response.status_code == 200:
+                        for line in response.text.split("\n"):
+                            if line.startswith(f"{self.species}:"):
+                                kegg_id = line.split("\t")[0]
+                                gene_to_kegg[gene] = kegg_id
+                                break
+                except Exception:
+                    pass
+
+            if self.progress:
+                self.progress.emit("genes", completed=completed, total=len(self.genes), mapped=len(gene_to_kegg))
 
         return gene_to_kegg
 
@@ -60,41 +243,729 @@ class GeneHandler:
         Returns:
             dict: A dictionary mapping KEGG IDs to lists of pathway IDs.
         """
+        tables = KeggTables()
+        kegg_ids = list(kegg_ids)
         kegg_to_pathways = {}
-        for kegg_id in kegg_ids:
+        links_by_species = {}
+        for completed, kegg_id in enumerate(kegg_ids, start=1):
+            # One bulk gene-pathway link table per species, downloaded on first use if warm-up skipped it
+            prefix = kegg_id.split(":")[0]
+            if prefix not in links_by_species:
+                try:
+                    links_by_species[prefix] = tables.get_links("pathway", prefix)
+                except Exception:
+                    links_by_species[prefix] = None  # Look the genes of this species up one by one
+
+            pathway_links = links_by_species[prefix]
+            if pathway_links is not None:
+                kegg_to_pathways[kegg_id] = [
+                    pathway.replace("path:", "") for pathway in pathway_links.get(kegg_id, [])
+                ]
+            else:
+                try:
+                    url = f"{self.base_url}/get/{kegg_id}"
+                    response = requests.get(url)
+                    time.sleep(KEGG_REQUEST_DELAY)  # Avoid overwhelming the KEGG server
+
+                    if response.status_code == 200:
+                        pathways = []
+                        for line in response.text.split("\n"):
+                            if line.startswith("PATHWAY"):
+                                pathway_id = line.split()[1]
+                                pathways.append(pathway_id)
+                        kegg_to_pathways[kegg_id] = pathways
+                except Exception:
+                    pass
+
+            if self.progress:
+                self.progress.emit("pathways", completed=completed, total=len(kegg_ids))
+
+        return kegg_to_pathways
+
+
+class KeggTables:
+    """
+    A shared, in-memory cache of bulk KEGG tables (`/list` and `/link` operations).
+
+    Every table is downloaded once per process and indexed into dictionaries,
+    so lookups for a whole gene list become hashed joins instead of one REST
+    call per gene. The cache lives on the class and is shared by all instances.
+    When `cache_folder` is set, downloaded tables are also stored on disk and
+    read back in one bulk read by later processes.
+
+    Attributes:
+        base_url (str): Base URL for the KEGG REST API.
+        cache_folder (str): Folder for downloaded tables (class-wide, None disables the disk cache).
+    """
+
+    cache_folder = None
+    _indexes = {}
+    _key_locks = {}
+    _lock = threading.Lock()
+
+    def __init__(self):
+        """
+        Initialize KeggTables with the KEGG REST API base URL.
+        """
+        self.base_url = KEGG_BASE_URL
+
+    def _cache_path(self, operation):
+        """
+        Returns the disk cache path of a table, or None when the disk cache is disabled.
+
+        Args:
+            operation (str): KEGG REST operation (e.g., 'link/ko/hsa').
+
+        Returns:
+            str: Path of the cached table.
+        """
+        if self.cache_folder is None:
+            return None
+        return os.path.join(self.cache_folder, f"kegg_{operation.replace('/', '_')}.tsv")
+
+    def is_cached(self, operation):
+        """
+        Checks whether a table is stored in the disk cache.
+
+        Args:
+            operation (str): KEGG REST operation (e.g., 'link/ko/hsa').
+
+        Returns:
+            bool: True if the table can be loaded without contacting KEGG.
+        """
+        cache_path = self._cache_path(operation)
+        return cache_path is not None and os.path.exists(cache_path)
+
+    def get_table(self, operation):
+        """
+        Loads a bulk KEGG table from the disk cache, or downloads it, and splits it into rows.
+
+        Args:
+            operation (str): KEGG REST operation (e.g., 'link/ko/hsa').
+
+        Returns:
+            list: Rows of the table, each a list of tab-separated fields.
+
+        Raises:
+            ValueError: If KEGG does not return the table.
+        """
+        cache_path = self._cache_path(operation)
+        if self.is_cached(operation):
+            with open(cache_path, "r", encoding="utf-8") as f:
+                text = f.read()  # One bulk read for the whole table
+        else:
+            url = f"{self.base_url}/{operation}"
+            response = requests.get(url)  # One request per table, no per-gene delay needed
+
+            if response.status_code != 200:
+                raise ValueError(f"Could not download KEGG table '{operation}' (status {response.status_code}).")
+
+            text = response.text
+            if cache_path is not None:
+                # Other workers never read half a table
+                _replace_atomically(cache_path, lambda f: f.write(text.encode("utf-8")))
+
+        return [line.split("\t") for line in text.split("\n") if line]
+
+    def peek(self, *key):
+        """
+        Returns an index only if it has already been loaded, without downloading anything.
+
+        Args:
+            *key: Cache key of the index (e.g., 'list', 'hsa').
+
+        Returns:
+            dict: The index, or None when it is not loaded.
+        """
+        return self._indexes.get(key)
+
+    def _cached(self, key, build):
+        """
+        Returns a cached index, building it on first use.
+
+        Loaded indexes are returned without locking. A missing index is built under a
+        lock of its own key, so only callers of the same table wait for its download.
+
+        Args:
+            key (tuple): Cache key of the index.
+            build (callable): Function that builds the index when it is missing.
+
+        Returns:
+            dict: The cached index.
+        """
+        index = self._indexes.get(key)
+        if index is not None:
+            return index
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self._indexes:
+                self._indexes[key] = build()
+            return self._indexes[key]
+
+    def get_links(self, target_db, source_db, reverse=False):
+        """
+        Returns the bulk `/link/{target_db}/{source_db}` table as a lookup dictionary.
+
+        Args:
+            target_db (str): KEGG database linked to (e.g., 'ko').
+            source_db (str): KEGG database linked from (e.g., 'hsa').
+            reverse (bool): Index the table by target ID instead of source ID.
+
+        Returns:
+            dict: A dictionary mapping each ID to a list of linked IDs.
+        """
+        def build():
+            links = {}
+            for row in self.get_table(f"link/{target_db}/{source_db}"):
+                if len(row) < 2:
+                    continue
+                source_id, target_id = row[0], row[1]
+                if reverse:
+                    source_id, target_id = target_id, source_id
+                links.setdefault(source_id, []).append(target_id)
+            return links
+
+        return self._cached(("link", target_db, source_db, reverse), build)
+
+    def get_symbol_index(self, species):
+        """
+        Returns an index of gene symbols to KEGG IDs for a species, built from `/list/{species}`.
+
+        Primary gene symbols take precedence over aliases. Symbols are stored in upper case.
+
+        Args:
+            species (str): Species code (e.g., 'hsa' for humans).
+
+        Returns:
+            dict: A dictionary mapping upper-case gene symbols to KEGG IDs.
+        """
+        def build():
+            primary = {}
+            aliases = {}
+            for row in self.get_table(f"list/{species}"):
+                if len(row) < 2:
+                    continue
+                # The last column reads "SYMBOL, ALIAS, ...; description"
+                symbols = row[-1].split(";")[0].split(",")
+                primary.setdefault(symbols[0].strip().upper(), row[0])
+                for alias in symbols[1:]:
+                    aliases.setdefault(alias.strip().upper(), row[0])
+            return {**aliases, **primary}
+
+        return self._cached(("list", species), build)
+
+    def get_pathway_names(self, species=None):
+        """
+        Returns the names of all pathways of a species, built from `/list/pathway/{species}`.
+
+        Args:
+            species (str): Species code (e.g., 'hsa' for humans); None for the reference 'map' pathways.
+
+        Returns:
+            dict: A dictionary mapping pathway IDs (e.g., 'hsa04110') to pathway names.
+        """
+        operation = f"list/pathway/{species}" if species else "list/pathway"
+
+        def build():
+            return {
+                row[0].replace("path:", ""): row[1]
+                for row in self.get_table(operation)
+                if len(row) >= 2
+            }
+
+        return self._cached(("pathway_names", species), build)
+
+    def preload(self, species_list, download=True):
+        """
+        Loads the symbol index, gene-pathway links and pathway names of several species.
+
+        Args:
+            species_list (list): Species codes to load (e.g., ['hsa', 'mmu']).
+            download (bool): Download tables missing from the disk cache; when False they are skipped.
+
+        Returns:
+            list: The KEGG operations that were loaded.
+        """
+        tables = []
+        for species in species_list:
+            tables += [
+                (f"list/{species}", self.get_symbol_index, (species,)),
+                (f"link/pathway/{species}", self.get_links, ("pathway", species)),
+                (f"list/pathway/{species}", self.get_pathway_names, (species,)),
+            ]
+        return self._preload(tables, download)
+
+    def preload_reactions(self, download=True):
+        """
+        Loads the compound, enzyme and KO links to reactions, the reaction-pathway links
+        and the reference pathway names used by ReactionQuery.
+
+        Args:
+            download (bool): Download tables missing from the disk cache; when False they are skipped.
+
+        Returns:
+            list: The KEGG operations that were loaded.
+        """
+        tables = [
+            (f"link/reaction/{source_db}", self.get_links, ("reaction", source_db))
+            for source_db in ReactionQuery.SOURCE_DATABASES.values()
+        ]
+        tables += [
+            ("link/pathway/reaction", self.get_links, ("pathway", "reaction")),
+            ("list/pathway", self.get_pathway_names, ()),
+        ]
+        return self._preload(tables, download)
+
+    def _preload(self, tables, download):
+        """
+        Loads a list of tables, skipping the ones that cannot be loaded.
+
+        Args:
+            tables (list): (operation, load function, arguments) tuples.
+            download (bool): Download tables missing from the disk cache; when False they are skipped.
+
+        Returns:
+            list: The KEGG operations that were loaded.
+        """
+        loaded = []
+        for operation, load, args in tables:
+            if not download and not self.is_cached(operation):
+                continue
             try:
-                url = f"{self.base_url}/get/{kegg_id}"
-                response = requests.get(url)
-                time.sleep(5)  # Avoid overwhelming the KEGG server
-
-                if response.status_code == 200:
-                    pathways = []
-                    for line in response.text.split("\n"):
-                        if line.startswith("PATHWAY"):
-                            pathway_id = line.split()[1]
-                            pathways.append(pathway_id)
-                    kegg_to_pathways[kegg_id] = pathways
+                load(*args)
+                loaded.append(operation)
             except Exception:
-                continue
+                continue  # The table is loaded on first use instead
+
+        return loaded
+
+
+class ReactionQuery:
+    """
+    A class to resolve compound, enzyme (EC) and KO identifiers to reactions and pathways.
+
+    Every hop (identifier to reaction, reaction to pathway) is a join against a
+    bulk `/link` table from the shared KeggTables cache, so no REST call is made
+    per identifier or per hop.
+
+    Attributes:
+        identifiers (dict): Recognized identifiers mapped to their KEGG form (e.g., 'C00031' to 'cpd:C00031').
+        unrecognized (list): Identifiers that are not compound, EC or KO identifiers.
+        tables (KeggTables): Shared cache of bulk KEGG tables.
+        progress (ProgressTracker): Receives progress events (optional).
+    """
+
+    # KEGG identifier prefix and the database its reactions are linked from
+    SOURCE_DATABASES = {"cpd": "compound", "ec": "enzyme", "ko": "ko"}
+    PATTERNS = {
+        "cpd": re.compile(r"^(cpd:)?(C\d{5})$", re.IGNORECASE),
+        "ec": re.compile(r"^((?i:ec:))?(\d+\.(?:\d+|-)\.(?:\d+|-)\.(?:n?\d+|-))$"),
+        "ko": re.compile(r"^(ko:)?(K\d{5})$", re.IGNORECASE),
+    }
+
+    def __init__(self, identifiers, progress=None):
+        """
+        Initialize ReactionQuery with the identifiers provided by the user.
+
+        Args:
+            identifiers (list): Compound (C00031), EC (2.7.1.1) and KO (K00844) identifiers.
+            progress (ProgressTracker): Receives progress events (optional).
+        """
+        self.identifiers = {}
+        self.unrecognized = []
+        for identifier in identifiers:
+            for prefix, pattern in self.PATTERNS.items():
+                match = pattern.match(identifier.strip())
+                if match:
+                    # EC numbers keep their case ('n' marks preliminary numbers), C and K are upper case
+                    entry = match.group(2) if prefix == "ec" else match.group(2).upper()
+                    self.identifiers[identifier] = f"{prefix}:{entry}"
+                    break
+            else:
+                self.unrecognized.append(identifier)
+
+        self.tables = KeggTables()
+        self.progress = progress
+
+    def get_reactions(self):
+        """
+        Maps every identifier to the reactions it takes part in.
+
+        Returns:
+            dict: A dictionary mapping identifiers to lists of reaction IDs (e.g., 'rn:R00299').
+        """
+        identifier_to_reactions = {}
+        for completed, (identifier, kegg_id) in enumerate(self.identifiers.items(), start=1):
+            source_db = self.SOURCE_DATABASES[kegg_id.split(":")[0]]
+            identifier_to_reactions[identifier] = self.tables.get_links("reaction", source_db).get(kegg_id, [])
+
+            if self.progress:
+                self.progress.emit("reactions", completed=completed, total=len(self.identifiers))
+
+        return identifier_to_reactions
+
+    def resolve(self):
+        """
+        Resolves every identifier to its reactions and the reference pathways of those reactions.
+
+        Returns:
+            dict: A dictionary keyed by identifier, with values of the form
+                {"kegg_id": str, "reactions": list, "pathways": {reaction: list of pathway IDs}}.
+                Pathway IDs are reference maps (e.g., 'map00010').
+        """
+        reaction_to_pathways = self.tables.get_links("pathway", "reaction")
+
+        resolved = {}
+        for identifier, reactions in self.get_reactions().items():
+            resolved[identifier] = {
+                "kegg_id": self.identifiers[identifier],
+                "reactions": reactions,
+                "pathways": {
+                    # The table links each reaction to both its 'rn' and 'map' pathway; keep the maps
+                    reaction: [
+                        pathway.replace("path:", "")
+                        for pathway in reaction_to_pathways.get(reaction, [])
+                        if pathway.startswith("path:map")
+                    ]
+                    for reaction in reactions
+                },
+            }
+
+        return resolved
+
+
+class OrthologyMapper:
+    """
+    A class to map genes of one species onto their orthologs in other species.
+
+    Genes are joined to KEGG Orthology (KO) identifiers and on to the target
+    species through the bulk `/link/ko/{species}` tables, so the whole gene
+    list is mapped to every target species in one pass.
+
+    Attributes:
+        genes (list): List of gene names or KEGG IDs provided by the user.
+        species (str): Species code of the input genes (e.g., 'hsa').
+        target_species (list): Species codes to find orthologs in (e.g., ['mmu', 'rno']).
+        tables (KeggTables): Shared cache of bulk KEGG tables.
+        progress (ProgressTracker): Receives progress events (optional).
+    """
+
+    def __init__(self, genes, species, target_species, progress=None):
+        """
+        Initialize OrthologyMapper with genes, source species and target species.
+
+        Args:
+            genes (list): List of gene names or KEGG IDs provided by the user.
+            species (str): Species code of the input genes (e.g., 'hsa').
+            target_species (list): Species codes to find orthologs in.
+            progress (ProgressTracker): Receives progress events (optional).
+        """
+        self.genes = genes
+        self.species = species
+        self.target_species = [target for target in target_species if target != species]
+        self.tables = KeggTables()
+        self.progress = progress
+
+    def get_kegg_ids(self):
+        """
+        Maps genes to KEGG IDs of the source species using the bulk symbol index.
+
+        Returns:
+            dict: A dictionary where keys are gene names and values are KEGG IDs.
+        """
+        symbol_index = self.tables.get_symbol_index(self.species)
+        gene_to_kegg = {}
+        for gene in self.genes:
+            if gene.startswith(f"{self.species}:"):
+                gene_to_kegg[gene] = gene
+            elif gene.upper() in symbol_index:
+                gene_to_kegg[gene] = symbol_index[gene.upper()]
+
+        return gene_to_kegg
+
+    def map_orthologs(self):
+        """
+        Maps every gene to its KO identifiers and to the orthologous genes in each target species.
+
+        Returns:
+            dict: A dictionary keyed by gene name, with values of the form
+                {"kegg_id": str, "ko": list, "orthologs": {species: list of KEGG IDs}}.
+                Genes without a KEGG ID are left out.
+        """
+        gene_to_kegg = self.get_kegg_ids()
+        gene_to_ko = self.tables.get_links("ko", self.species)
+        ko_to_targets = {
+            target: self.tables.get_links("ko", target, reverse=True)
+            for target in self.target_species
+        }
+
+        orthologs = {}
+        for gene, kegg_id in gene_to_kegg.items():
+            kos = gene_to_ko.get(kegg_id, [])
+            orthologs[gene] = {
+                "kegg_id": kegg_id,
+                "ko": kos,
+                "orthologs": {
+                    target: [ortholog for ko in kos for ortholog in ko_to_genes.get(ko, [])]
+                    for target, ko_to_genes in ko_to_targets.items()
+                },
+            }
+
+        if self.progress:
+            self.progress.emit("genes", completed=len(self.genes), total=len(self.genes), mapped=len(orthologs))
+
+        return orthologs
+
+    def get_pathway_ids(self, kegg_ids):
+        """
+        Retrieves pathway IDs for KEGG IDs of the source and target species.
+
+        Every species is resolved through its bulk `/link/pathway/{species}` table,
+        so orthologs never cause one REST call per gene.
+
+        Args:
+            kegg_ids (list): List of KEGG IDs (e.g., 'hsa:7157', 'mmu:22059').
+
+        Returns:
+            dict: A dictionary mapping KEGG IDs to lists of pathway IDs.
+        """
+        kegg_ids = list(kegg_ids)
+        kegg_to_pathways = {}
+        for kegg_id in kegg_ids:
+            pathway_links = self.tables.get_links("pathway", kegg_id.split(":")[0])
+            kegg_to_pathways[kegg_id] = [pathway.replace("path:", "") for pathway in pathway_links.get(kegg_id, [])]
+
+        if self.progress:
+            self.progress.emit("pathways", completed=len(kegg_ids), total=len(kegg_ids))
 
         return kegg_to_pathways
 
 
+class ExpressionTable:
+    """
+    A class to load gene expression or fold-change tables into a columnar NumPy array.
+
+    The first column of the table holds gene names or KEGG IDs, the remaining
+    columns hold one numeric value per sample. Tables are parsed in chunks, so
+    only one chunk of rows exists as Python objects at a time, and can be cached
+    as `.npy` files that are memory-mapped on the next load. Values are stored
+    column-major (Fortran order), so reading one sample touches one contiguous
+    block of the file.
+
+    Attributes:
+        ids (numpy.ndarray): Gene names or KEGG IDs, one per row.
+        samples (list): Sample (column) names.
+        values (numpy.ndarray): Column-major float32 array of shape (rows, samples).
+    """
+
+    def __init__(self, ids, samples, values):
+        """
+        Initialize ExpressionTable with parsed table data.
+
+        Args:
+            ids (numpy.ndarray): Gene names or KEGG IDs, one per row.
+            samples (list): Sample (column) names.
+            values (numpy.ndarray): float32 array of shape (rows, samples).
+        """
+        self.ids = ids
+        self.samples = samples
+        self.values = values
+
+    @classmethod
+    def from_file(cls, file_path, cache_folder=None, chunk_size=50000):
+        """
+        Loads a CSV or TSV table, optionally gzipped, using the cache when possible.
+
+        Args:
+            file_path (str): Path to the table.
+            cache_folder (str): Folder for memory-mappable `.npy` copies (optional).
+            chunk_size (int): Number of rows parsed per chunk.
+
+        Returns:
+            ExpressionTable: The loaded table.
+
+        Raises:
+            ValueError: If the table has no sample columns or no rows.
+        """
+        if cache_folder is None:
+            return cls(*cls._parse(file_path, chunk_size))
+
+        # Cache entries are keyed by the file contents, so re-uploads hit the cache
+        digest = hashlib.sha1()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        cache_prefix = os.path.join(cache_folder, f"expression_{digest.hexdigest()}")
+
+        if not os.path.exists(f"{cache_prefix}.values.npy"):
+            ids, samples, values = cls._parse(file_path, chunk_size)
+            # The values file is written last, its presence marks a complete cache entry
+            _replace_atomically(f"{cache_prefix}.ids.npy", lambda f: np.save(f, ids))
+            _replace_atomically(f"{cache_prefix}.samples.txt", lambda f: f.write("\n".join(samples).encode("utf-8")))
+            _replace_atomically(f"{cache_prefix}.values.npy", lambda f: np.save(f, values))
+
+        with open(f"{cache_prefix}.samples.txt", "r", encoding="utf-8") as f:
+            samples = f.read().split("\n")
+        return cls(
+            np.load(f"{cache_prefix}.ids.npy", mmap_mode="r"),
+            samples,
+            np.load(f"{cache_prefix}.values.npy", mmap_mode="r"),
+        )
+
+    @staticmethod
+    def _parse(file_path, chunk_size):
+        """
+        Parses a table chunk by chunk into an ID array and a float32 value matrix.
+
+        Args:
+            file_path (str): Path to the table.
+            chunk_size (int): Number of rows parsed per chunk.
+
+        Returns:
+            tuple: (ids, samples, values) as described on the class, with values in column-major order.
+        """
+        with open(file_path, "rb") as f:
+            is_gzipped = f.read(2) == b"\x1f\x8b"
+        opener = gzip.open if is_gzipped else open
+
+        with opener(file_path, "rt", newline="") as f:
+            header = f.readline()
+            delimiter = "\t" if "\t" in header else ","
+            samples = [name.strip() for name in next(csv.reader([header], delimiter=delimiter))[1:]]
+            if not samples:
+                raise ValueError("The expression table needs at least one sample column.")
+
+            id_chunks = []
+            value_chunks = []
+            ids = []
+            rows = []
+            for row in csv.reader(f, delimiter=delimiter):
+                if not row or not row[0].strip():
+                    continue
+                ids.append(row[0].strip())
+                rows.append(row[1:len(samples) + 1])
+                if len(rows) == chunk_size:
+                    id_chunks.append(np.array(ids))
+                    value_chunks.append(ExpressionTable._to_matrix(rows, len(samples)))
+                    ids = []
+                    rows = []
+            if rows:
+                id_chunks.append(np.array(ids))
+                value_chunks.append(ExpressionTable._to_matrix(rows, len(samples)))
+
+        if not value_chunks:
+            raise ValueError("The expression table contains no rows.")
+
+        return np.concatenate(id_chunks), samples, np.asfortranarray(np.concatenate(value_chunks))
+
+    @staticmethod
+    def _to_matrix(rows, n_samples):
+        """
+        Converts a chunk of string rows to a float32 matrix, using NaN for missing values.
+
+        Args:
+            rows (list): Rows of value strings.
+            n_samples (int): Number of sample columns.
+
+        Returns:
+            numpy.ndarray: float32 array of shape (len(rows), n_samples).
+        """
+        matrix = np.full((len(rows), n_samples), np.nan, dtype=np.float32)
+        for i, row in enumerate(rows):
+            for j, value in enumerate(row):
+                try:
+                    matrix[i, j] = float(value)
+                except ValueError:
+                    continue  # Empty cells and "NA" stay NaN
+        return matrix
+
+    def to_kegg(self, species, sample=None):
+        """
+        Joins the table to KEGG IDs through the species symbol index.
+
+        Args:
+            species (str): Species code (e.g., 'hsa' for humans).
+            sample (str): Sample column to use (defaults to the first one).
+
+        Returns:
+            dict: A dictionary mapping KEGG IDs to the sample value. Rows without
+                a KEGG ID or value are left out; the first row of a gene wins.
+
+        Raises:
+            ValueError: If the sample column does not exist.
+        """
+        if sample is None:
+            column = 0
+        elif sample in self.samples:
+            column = self.samples.index(sample)
+        else:
+            raise ValueError(f"Sample '{sample}' not found in the expression table.")
+
+        symbol_index = KeggTables().get_symbol_index(species)
+        column_values = np.asarray(self.values[:, column])
+        present = ~np.isnan(column_values)
+
+        gene_values = {}
+        for gene, value in zip(self.ids[present], column_values[present]):
+            gene = str(gene)
+            kegg_id = gene if gene.startswith(f"{species}:") else symbol_index.get(gene.upper())
+            if kegg_id and kegg_id not in gene_values:
+                gene_values[kegg_id] = float(value)
+
+        return gene_values
+
+
 class PathwayGenerator:
     """
     A class to handle the generation and saving of pathway maps.
 
     Attributes:
         base_url (str): Base URL for the KEGG REST API.
+        progress (ProgressTracker): Receives progress events (optional).
     """
 
-    def __init__(self):
+    def __init__(self, progress=None):
         """
         Initialize PathwayGenerator with the KEGG REST API base URL.
+
+        Args:
+            progress (ProgressTracker): Receives progress events (optional).
         """
-        self.base_url = "http://rest.kegg.jp"
+        self.base_url = KEGG_BASE_URL
+        self.progress = progress
 
-    def save_pathway(self, pathway_id, highlighted_genes, output_folder: str):
+    def save_pathways(self, pathway_genes, output_folder: str, gene_values=None):
+        """
+        Saves several pathway maps, reporting each finished map as a progress event.
+
+        Args:
+            pathway_genes (dict): Pathway IDs mapped to the KEGG IDs to highlight on them.
+            output_folder: folder where the pngs are stored
+            gene_values (dict): KEGG IDs mapped to expression values used to color genes (optional).
+
+        Returns:
+            list: File names of the pathway maps that were saved as PNG.
+        """
+        saved_files = []
+        for completed, (pathway_id, highlighted_genes) in enumerate(pathway_genes.items(), start=1):
+            self.save_pathway(pathway_id, highlighted_genes, output_folder, gene_values)
+
+            file_name = f"{pathway_id}.png"
+            if os.path.exists(os.path.join(output_folder, file_name)):
+                saved_files.append(file_name)
+            else:
+                file_name = None
+
+            if self.progress:
+                self.progress.emit(
+                    "images", completed=completed, total=len(pathway_genes), pathway_id=pathway_id, file=file_name
+                )
+
+        return saved_files
+
+    def save_pathway(self, pathway_id, highlighted_genes, output_folder: str, gene_values=None):
         """
         Fetches and saves pathway map data using the KEGG REST API.
 
@@ -102,6 +973,7 @@ class PathwayGenerator:
             pathway_id (str): KEGG pathway ID (e.g., 'hsa04137').
             highlighted_genes (list): List of KEGG IDs to highlight (currently unused).
             output_folder: folder where png is stored
+            gene_values (dict): KEGG IDs mapped to expression values used to color genes (optional).
 
         Raises:
             Exception: If there is an error retrieving or saving the pathway map.
@@ -119,13 +991,16 @@ class PathwayGenerator:
             # Fetch pathway details from the KEGG REST API
             url = f"{self.base_url}/get/{pathway_id}/image"
             response = requests.get(url, stream=True)
-            time.sleep(5)  # Avoid overwhelming the KEGG server
+            time.sleep(KEGG_REQUEST_DELAY)  # Avoid overwhelming the KEGG server
 
             if response.status_code == 200 and response.headers.get("Content-Type") == "image/png":
                 # Save the image data to a file
                 with open(output_path, "wb") as f:
                     for chunk in response.iter_content(chunk_size=8192):
                         f.write(chunk)
+
+                if gene_values:
+                    self.color_genes(pathway_id, output_path, gene_values)
             else:
                 # Fallback: Save response content as a text file
                 fallback_path = output_path.replace(".png", ".txt")
@@ -139,4 +1014,247 @@ class PathwayGenerator:
             fallback_path = output_path.replace(".png", "_error.txt")
 
             with open(fallback_path, "w") as f:
-                f.write(f"Error retrieving pathway map: {str(e)}")
\ No newline at end of file
+                f.write(f"Error retrieving pathway map: {str(e)}")
+
+    def color_genes(self, pathway_id, image_path, gene_values):
+        """
+        Colors the gene boxes of a saved pathway map by expression value.
+
+        Box positions are read from the pathway's KGML. Positive values are
+        drawn red and negative values blue, scaled to the largest absolute value.
+
+        Args:
+            pathway_id (str): KEGG pathway ID (e.g., 'hsa04137').
+            image_path (str): Path of the saved pathway PNG.
+            gene_values (dict): KEGG IDs mapped to expression values.
+        """
+        url = f"{self.base_url}/get/{pathway_id}/kgml"
+        response = requests.get(url)
+        time.sleep(KEGG_REQUEST_DELAY)  # Avoid overwhelming the KEGG server
+
+        if response.status_code != 200:
+            return
+
+        boxes = []
+        box_values = []
+        for entry in ET.fromstring(response.content).iter("entry"):
+            graphics = entry.find("graphics")
+            if entry.get("type") != "gene" or graphics is None:
+                continue
+            values = [gene_values[name] for name in entry.get("name", "").split() if name in gene_values]
+            if values:
+                boxes.append(graphics)
+                box_values.append(values[0])
+
+        if not boxes:
+            return
+
+        colors = self._value_colors(np.array(box_values, dtype=np.float32))
+
+        image = Image.open(image_path).convert("RGBA")
+        overlay = Image.new("RGBA", image.size, (0, 0, 0, 0))
+        draw = ImageDraw.Draw(overlay)
+        for graphics, color in zip(boxes, colors):
+            # KGML gives the centre of each box
+            x, y = float(graphics.get("x", 0)), float(graphics.get("y", 0))
+            half_width, half_height = float(graphics.get("width", 0)) / 2, float(graphics.get("height", 0)) / 2
+            draw.rectangle(
+                [x - half_width, y - half_height, x + half_width, y + half_height],
+                fill=(*color, 120),
+            )
+        Image.alpha_composite(image, overlay).convert("RGB").save(image_path, "PNG")
+
+    @staticmethod
+    def _value_colors(values):
+        """
+        Maps values onto a blue-white-red color scale.
+
+        Args:
+            values (numpy.ndarray): Expression values.
+
+        Returns:
+            list: An (r, g, b) tuple per value.
+        """
+        scale = np.abs(values).max() or 1.0
+        t = np.clip(values / scale, -1.0, 1.0)
+        fade = (255 * (1 - np.abs(t))).astype(np.uint8)
+        full = np.full_like(fade, 255)
+        red = np.where(t >= 0, full, fade)
+        blue = np.where(t >= 0, fade, full)
+        return [tuple(int(c) for c in rgb) for rgb in zip(red, fade, blue)]
+
+
+class ImageDerivatives:
+    """
+    A class to create and cache smaller versions of saved pathway maps.
+
+    Derivatives are created on first request (or ahead of time in a shared
+    background pool) and stored in a `_derived` folder next to the original.
+    When all derivatives under the output folder exceed the cache budget, the
+    least recently used ones are removed.
+
+    Attributes:
+        output_folder (str): Folder that holds one sub folder per job.
+        max_cache_bytes (int): Total size the derivatives may take up.
+    """
+
+    SIZES = {"thumb": 240, "medium": 960}  # Maximum width in pixels
+    _executor = ThreadPoolExecutor(max_workers=2)
+
+    def __init__(self, output_folder, max_cache_bytes=256 * 1024 * 1024):
+        """
+        Initialize ImageDerivatives with the output folder and cache budget.
+
+        Args:
+            output_folder (str): Folder that holds one sub folder per job.
+            max_cache_bytes (int): Total size the derivatives may take up.
+        """
+        self.output_folder = output_folder
+        self.max_cache_bytes = max_cache_bytes
+
+    def get(self, image_path, size):
+        """
+        Returns the path of a derivative, creating it when it is missing or outdated.
+
+        Args:
+            image_path (str): Path of the original pathway PNG.
+            size (str): Name of the derivative size ('thumb' or 'medium').
+
+        Returns:
+            str: Path of the derivative PNG.
+
+        Raises:
+            ValueError: If the size is unknown.
+        """
+        if size not in self.SIZES:
+            raise ValueError(f"Unknown image size '{size}'.")
+
+        folder, file_name = os.path.split(image_path)
+        derived_folder = os.path.join(folder, "_derived")
+        derived_path = os.path.join(derived_folder, f"{os.path.splitext(file_name)[0]}.{size}.png")
+
+        if os.path.exists(derived_path) and os.path.getmtime(derived_path) >= os.path.getmtime(image_path):
+            # Mark as recently used through the access time; the modification time stays stable for ETags
+            os.utime(derived_path, (time.time(), os.path.getmtime(derived_path)))
+            return derived_path
+
+        os.makedirs(derived_folder, exist_ok=True)
+        with Image.open(image_path) as image:
+            # Only the width is bounded; thumbnail() keeps the aspect ratio and never enlarges
+            image.thumbnail((self.SIZES[size], image.height))
+            # Concurrent requests in any worker process never see half an image
+            _replace_atomically(derived_path, lambda f: image.save(f, "PNG", optimize=True))
+
+        self.evict()
+        return derived_path
+
+    def schedule(self, image_path):
+        """
+        Creates all derivatives of an image in the background pool.
+
+        Args:
+            image_path (str): Path of the original pathway PNG.
+        """
+        for size in self.SIZES:
+            self._executor.submit(self.get, image_path, size)
+
+    def evict(self):
+        """
+        Removes the least recently used derivatives until the cache fits its budget.
+        """
+        derived_files = []
+        for path in glob.glob(os.path.join(self.output_folder, "*", "_derived", "*.png")):
+            try:
+                derived_files.append((os.path.getatime(path), os.path.getsize(path), path))
+            except OSError:
+                continue  # Removed by another thread
+
+        total = sum(size for _, size, _ in derived_files)
+        for _, size, path in sorted(derived_files):
+            if total <= self.max_cache_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+
+class JobArchive:
+    """
+    A class to stream the files of a job folder as a ZIP archive.
+
+    The archive is written chunk by chunk into a small in-memory buffer that is
+    emptied after every chunk, so no archive is stored on disk and memory use does
+    not grow with the size of the export. Only the pathway maps and result tables
+    are exported; the progress log and error notes stay behind. PNG entries are
+    stored as-is because they are already compressed; tables are deflated.
+
+    Attributes:
+        job_folder (str): Folder with the files of the job.
+    """
+
+    EXTENSIONS = (".png", ".tsv")
+
+    def __init__(self, job_folder):
+        """
+        Initialize JobArchive with the folder to export.
+
+        Args:
+            job_folder (str): Folder with the files of the job.
+        """
+        self.job_folder = job_folder
+
+    def iter_chunks(self, chunk_size=65536):
+        """
+        Generates the ZIP archive of the pathway maps and result tables in the job folder.
+
+        Args:
+            chunk_size (int): Number of bytes read from a file at a time.
+
+        Yields:
+            bytes: The next part of the archive.
+        """
+        buffer = _ChunkBuffer()
+        with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for name in sorted(os.listdir(self.job_folder)):
+                path = os.path.join(self.job_folder, name)
+                if not name.endswith(self.EXTENSIONS) or not os.path.isfile(path):
+                    continue
+
+                info = zipfile.ZipInfo.from_file(path, name)
+                info.compress_type = zipfile.ZIP_STORED if name.endswith(".png") else zipfile.ZIP_DEFLATED
+                with open(path, "rb") as source, archive.open(info, "w") as target:
+                    for block in iter(lambda: source.read(chunk_size), b""):
+                        target.write(block)
+                        data = buffer.take()
+                        if data:
+                            yield data
+
+                data = buffer.take()
+                if data:
+                    yield data
+
+        # Closing the archive writes the central directory
+        yield buffer.take()
+
+
+class _ChunkBuffer:
+    """
+    A write-only, unseekable file object that hands out what was written since the last take.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
@@ -0,0 +1,37 @@
+import pytest
+from backend import KEGG_BASE_URL, KeggTables  # Import the shared KEGG table cache from backend.py
+
+
+@pytest.fixture(autouse=True)
+def isolated_tables(monkeypatch):
+    """
+    Pytest fixture that empties the shared table cache around every test and disables the disk cache,
+    so no test reads or writes the real KEGG cache folder.
+    """
+    monkeypatch.setattr(KeggTables, "cache_folder", None)
+    KeggTables._indexes.clear()
+    yield
+    KeggTables._indexes.clear()
+
+
+@pytest.fixture
+def mock_kegg(mocker):
+    """
+    Pytest fixture that serves simulated bulk tables instead of the KEGG REST API.
+
+    Returns a function that takes the tables of a test file, keyed by REST operation
+    (e.g. 'list/hsa'), and returns the patched `requests.get` mock. Operations that
+    are not in the tables answer with a 404.
+    """
+    def serve(tables):
+        def fake_get(url):
+            operation = url.replace(f"{KEGG_BASE_URL}/", "")
+            response = mocker.Mock()
+            response.status_code = 200 if operation in tables else 404
+            response.text = tables.get(operation, "")
+            return response
+
+        mocker.patch("backend.time.sleep")
+        return mocker.patch("backend.requests.get", side_effect=fake_get)
+
+    return serve
@@ -0,0 +1,393 @@
+"""
+Description: Load-tests the Flask app under gunicorn with threaded (gthread) workers
+against a local KEGG stand-in with injected latency. Concurrent clients drive a
+configurable mix of form submissions, file uploads and /pathway and /latest_image
+views; throughput, latency percentiles and error rates are reported per request type.
+Every submitted job is followed through /progress/<job_id> until it is done or fails,
+and its latency, failure rate and the jobs still running at the end are reported too.
+Requires gunicorn (listed in requirements.txt); jobs run in threads of the worker
+that accepted them, which a forking development server would kill.
+Date: 19/10/2026
+Version: 1.0
+
+Example:
+    python pytests/load_test.py --workers 4 --clients 32 --duration 60 --latency 0.3 \
+        --mix submit=2,upload=1,pathway=4,latest_image=4
+"""
+
+import argparse
+import importlib.util
+import io
+import json
+import math
+import os
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from PIL import Image
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Genes known to the KEGG stand-in, with fake KEGG IDs and pathways
+GENES = ["TP53", "BRCA1", "EGFR", "MYC", "AKT1", "KRAS", "PTEN", "CDK4"]
+PATHWAYS = ["hsa04110", "hsa04115", "hsa05200", "hsa04151"]
+
+# Request types that start a job, and the statuses that are not errors per request type
+JOB_SCENARIOS = {"submit", "upload"}
+EXPECTED_STATUS = {"latest_image": (200, 404)}  # 404 until the first pathway map exists
+
+# The job page opens its progress stream at /progress/<job_id>
+JOB_ID_PATTERN = re.compile(r"/progress/([0-9a-f]+)")
+
+
+def make_png():
+    """
+    Creates the small pathway map the KEGG stand-in serves for every pathway.
+    """
+    buffer = io.BytesIO()
+    Image.new("RGB", (1200, 900), "white").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class MockKeggHandler(BaseHTTPRequestHandler):
+    """
+    Answers the KEGG REST operations used by the backend after an injected delay.
+    """
+
+    latency = 0.0
+    png = b""
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        parts = self.path.strip("/").split("/")
+        content_type = "text/plain"
+
+        if parts[:2] == ["find", "genes"]:
+            gene = parts[2].upper()
+            body = f"hsa:{GENES.index(gene) + 1}\t{gene}; mock gene\n" if gene in GENES else ""
+        elif parts[0] == "get" and parts[-1] == "image":
+            body, content_type = self.png, "image/png"
+        elif parts[0] == "get" and parts[-1] == "kgml":
+            body = '<pathway><entry id="1" name="hsa:1" type="gene"><graphics x="50" y="50" width="46" height="17"/></entry></pathway>'
+        elif parts[0] == "get":
+            body = f"ENTRY       {parts[1]}\nPATHWAY     {random.choice(PATHWAYS)}  Mock pathway\n"
+        elif parts == ["list", "pathway", "hsa"]:
+            body = "".join(f"path:{pathway}\tMock pathway {pathway}\n" for pathway in PATHWAYS)
+        elif parts == ["list", "hsa"]:
+            body = "".join(f"hsa:{i}\tCDS\t1:1..100\t{gene}; mock gene\n" for i, gene in enumerate(GENES, start=1))
+        elif parts == ["link", "pathway", "hsa"]:
+            body = "".join(
+                f"hsa:{i}\tpath:{PATHWAYS[i % len(PATHWAYS)]}\n" for i in range(1, len(GENES) + 1)
+            )
+        else:
+            self.send_error(404)
+            return
+
+        data = body if isinstance(body, bytes) else body.encode()
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Background jobs of the app are killed when the test ends
+
+    def log_message(self, format, *args):
+        pass  # Keep the report readable
+
+
+def free_port():
+    """
+    Returns a TCP port that is free on localhost.
+    """
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app_server(workers, threads, port, env):
+    """
+    Starts app.py under gunicorn with threaded workers in a subprocess.
+    """
+    command = [
+        sys.executable, "-m", "gunicorn", "--workers", str(workers),
+        "--worker-class", "gthread", "--threads", str(threads),
+        "--bind", f"127.0.0.1:{port}", "--log-level", "warning", "app:create_app()",
+    ]
+    return subprocess.Popen(command, cwd=REPO_DIR, env=env, stderr=subprocess.DEVNULL)
+
+
+def wait_until_up(url, timeout=60):
+    """
+    Polls the app until it answers, so warm-up is not counted as latency.
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"The app did not start within {timeout} s")
+
+
+def make_scenarios(app_url):
+    """
+    Returns the request types the clients can send, keyed by name.
+    """
+    def submit(session, rng):
+        genes = ", ".join(rng.sample(GENES, 3))
+        return session.post(f"{app_url}/kegg_tool", data={"species": "hsa", "genes": genes}, timeout=60)
+
+    def upload(session, rng):
+        gene_file = "\n".join(rng.sample(GENES, 4)).encode()
+        return session.post(
+            f"{app_url}/kegg_tool", data={"species": "hsa"},
+            files={"gene_file": ("genes.txt", gene_file, "text/plain")}, timeout=60,
+        )
+
+    def pathway(session, rng):
+        return session.get(f"{app_url}/pathway", timeout=60)
+
+    def latest_image(session, rng):
+        return session.get(f"{app_url}/latest_image", timeout=60)
+
+    return {"submit": submit, "upload": upload, "pathway": pathway, "latest_image": latest_image}
+
+
+def follow_job(session, app_url, job_id, deadline):
+    """
+    Reads the progress stream of a job until it is done or fails, or the load test ends.
+
+    Returns:
+        str: 'done', 'error', or 'in_flight' when the job was still running at the deadline.
+    """
+    remaining = max(1.0, deadline - time.time())
+    try:
+        with session.get(f"{app_url}/progress/{job_id}", stream=True, timeout=(10, remaining)) as response:
+            if response.status_code != 200:
+                return "error"  # The job is unknown to the worker that answered
+            for line in response.iter_lines(decode_unicode=True):
+                if line in ("event: done", "event: error"):
+                    return line.split(": ")[1]
+                if time.time() >= deadline:
+                    return "in_flight"
+    except requests.RequestException:
+        if time.time() >= deadline:
+            return "in_flight"
+    return "error"  # The stream ended or broke before the job finished
+
+
+def parse_mix(mix):
+    """
+    Parses a mix such as 'submit=2,pathway=4' into a dictionary of weights.
+    """
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def run_clients(app_url, scenarios, weights, clients, duration, seed):
+    """
+    Runs concurrent clients for a fixed duration and records every request and job.
+
+    A client that starts a job follows its progress until the job ends, like a user
+    waiting on the job page, before it sends the next request.
+
+    Returns:
+        tuple: Per request type, a list of (latency in seconds, status code or None on errors),
+            and per job type, a list of (latency in seconds, 'done', 'error' or 'in_flight').
+    """
+    results = defaultdict(list)
+    job_results = defaultdict(list)
+    lock = threading.Lock()
+    deadline = time.time() + duration
+    names = list(weights)
+
+    def client(index):
+        rng = random.Random(seed + index)
+        session = requests.Session()
+        while time.time() < deadline:
+            name = rng.choices(names, weights=[weights[n] for n in names])[0]
+            start = time.perf_counter()
+            try:
+                response = scenarios[name](session, rng)
+                status = response.status_code
+            except requests.RequestException:
+                response, status = None, None  # Timeouts and refused connections
+            with lock:
+                results[name].append((time.perf_counter() - start, status))
+
+            if name in JOB_SCENARIOS:
+                match = JOB_ID_PATTERN.search(response.text) if status == 200 else None
+                # A page without a progress stream means the job was rejected
+                outcome = follow_job(session, app_url, match.group(1), deadline) if match else "error"
+                with lock:
+                    job_results[name].append((time.perf_counter() - start, outcome))
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, job_results
+
+
+def percentile(sorted_values, fraction):
+    """
+    Returns the nearest-rank percentile of an already sorted list.
+    """
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(results, duration):
+    """
+    Computes throughput, latency percentiles and error rates per request type and overall.
+    """
+    summary = {}
+    # Every record becomes (latency, is error), so the overall row can mix request types
+    rows = {
+        name: [(latency, status not in EXPECTED_STATUS.get(name, (200,))) for latency, status in records]
+        for name, records in results.items()
+    }
+    rows["all"] = [record for records in list(rows.values()) for record in records]
+    for name, records in rows.items():
+        if not records:
+            continue
+        latencies = sorted(latency for latency, _ in records)
+        errors = sum(1 for _, is_error in records if is_error)
+        summary[name] = {
+            "requests": len(records),
+            "throughput_rps": round(len(records) / duration, 2),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+            "p90_ms": round(percentile(latencies, 0.90) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+            "max_ms": round(latencies[-1] * 1000, 1),
+            "error_rate": round(errors / len(records), 4),
+        }
+    return summary
+
+
+def summarize_jobs(job_results):
+    """
+    Computes job latency percentiles, failure rates and the jobs still running per job type and overall.
+
+    Latencies run from the submission until the done or error event; jobs still running
+    when the load test ends are only counted as in flight.
+    """
+    summary = {}
+    rows = dict(job_results)
+    rows["all"] = [record for records in job_results.values() for record in records]
+    for name, records in rows.items():
+        finished = sorted(latency for latency, outcome in records if outcome != "in_flight")
+        failed = sum(1 for _, outcome in records if outcome == "error")
+        summary[name] = {
+            "jobs": len(records),
+            "done": len(finished) - failed,
+            "p50_s": round(percentile(finished, 0.50), 2) if finished else None,
+            "p90_s": round(percentile(finished, 0.90), 2) if finished else None,
+            "max_s": round(finished[-1], 2) if finished else None,
+            "failure_rate": round(failed / len(finished), 4) if finished else None,
+            "in_flight": len(records) - len(finished),
+        }
+    return summary
+
+
+def print_table(title, summary, columns):
+    """
+    Prints a summary as a table.
+    """
+    print(f"\n{title:<14}" + "".join(f"{column:>16}" for column in columns))
+    for name, stats in summary.items():
+        print(f"{name:<14}" + "".join(f"{str(stats[column]):>16}" for column in columns))
+
+
+def print_report(summary, job_summary):
+    """
+    Prints the request and job summaries as tables.
+    """
+    print_table("request", summary,
+                ["requests", "throughput_rps", "p50_ms", "p90_ms", "p99_ms", "max_ms", "error_rate"])
+    if job_summary:
+        print_table("job", job_summary, ["jobs", "done", "p50_s", "p90_s", "max_s", "failure_rate", "in_flight"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="Number of gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=8, help="Number of threads per worker")
+    parser.add_argument("--clients", type=int, default=16, help="Number of concurrent clients")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to generate load")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds the KEGG stand-in waits per request")
+    parser.add_argument("--mix", default="submit=2,upload=1,pathway=4,latest_image=4",
+                        help="Weights of the request types")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed of the clients")
+    parser.add_argument("--json", dest="json_path", help="Also write the summary to this JSON file")
+    args = parser.parse_args()
+
+    if importlib.util.find_spec("gunicorn") is None:
+        sys.exit("The load test needs gunicorn; install it with `pip install -r requirements.txt`.")
+
+    weights = parse_mix(args.mix)
+
+    # Start the KEGG stand-in
+    MockKeggHandler.latency = args.latency
+    MockKeggHandler.png = make_png()
+    mock_server = ThreadingHTTPServer(("127.0.0.1", free_port()), MockKeggHandler)
+    threading.Thread(target=mock_server.serve_forever, daemon=True).start()
+    kegg_url = f"http://127.0.0.1:{mock_server.server_address[1]}"
+
+    # Run the app on its own data folder, so the real cache and output stay untouched
+    data_folder = tempfile.mkdtemp(prefix="kegg_load_test_")
+    env = dict(
+        os.environ,
+        KEGG_BASE_URL=kegg_url,
+        KEGG_REQUEST_DELAY="0",
+        KEGG_DATA_FOLDER=data_folder,
+        KEGG_WARM_UP="download",
+    )
+    port = free_port()
+    app_process = start_app_server(args.workers, args.threads, port, env)
+    app_url = f"http://127.0.0.1:{port}"
+
+    try:
+        wait_until_up(f"{app_url}/")
+        scenarios = make_scenarios(app_url)
+        unknown = set(weights) - set(scenarios)
+        if unknown:
+            parser.error(f"Unknown request types in --mix: {', '.join(sorted(unknown))}")
+
+        print(f"Load test: gunicorn with {args.workers} workers x {args.threads} threads, {args.clients} clients, "
+              f"{args.duration:.0f} s, KEGG latency {args.latency * 1000:.0f} ms")
+        results, job_results = run_clients(app_url, scenarios, weights, args.clients, args.duration, args.seed)
+        summary = summarize(results, args.duration)
+        job_summary = summarize_jobs(job_results) if job_results else {}
+        print_report(summary, job_summary)
+
+        if args.json_path:
+            with open(args.json_path, "w") as f:
+                json.dump({"requests": summary, "jobs": job_summary}, f, indent=2)
+    finally:
+        app_process.terminate()
+        app_process.wait()
+        mock_server.shutdown()
+        shutil.rmtree(data_folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import pytest
+import gzip
+import numpy as np
+from PIL import Image
+from backend import ExpressionTable, KeggTables, PathwayGenerator  # Import the expression classes from backend.py
+
+CSV_TABLE = "gene,control,treated\nTP53,1.5,-2.0\nBRCA1,NA,0.5\nMYC,-1.0,\nTP53,9.0,9.0\n"
+
+
+@pytest.fixture(autouse=True)
+def symbol_index():
+    """
+    Pytest fixture that fills the shared table cache with a small symbol index.
+    """
+    KeggTables._indexes.clear()
+    KeggTables._indexes[("list", "hsa")] = {"TP53": "hsa:7157", "BRCA1": "hsa:672"}
+    yield
+    KeggTables._indexes.clear()
+
+
+def test_parse_csv_in_chunks(tmp_path):
+    """
+    Test that a CSV table is parsed into IDs, sample names and a float32 matrix across chunk borders.
+    """
+    table_path = tmp_path / "expression.csv"
+    table_path.write_text(CSV_TABLE)
+
+    table = ExpressionTable.from_file(str(table_path), chunk_size=3)
+
+    assert list(table.ids) == ["TP53", "BRCA1", "MYC", "TP53"]
+    assert table.samples == ["control", "treated"]
+    assert table.values.dtype == np.float32
+    assert table.values.shape == (4, 2)
+    assert table.values.flags["F_CONTIGUOUS"]
+    assert np.isnan(table.values[1, 0]) and np.isnan(table.values[2, 1])
+
+
+def test_gzipped_tsv_is_cached_and_memory_mapped(tmp_path):
+    """
+    Test that a gzipped TSV table is cached as .npy files and memory-mapped on the next load.
+    """
+    table_path = tmp_path / "expression.tsv.gz"
+    with gzip.open(table_path, "wt") as f:
+        f.write(CSV_TABLE.replace(",", "\t"))
+
+    first = ExpressionTable.from_file(str(table_path), cache_folder=str(tmp_path))
+    second = ExpressionTable.from_file(str(table_path), cache_folder=str(tmp_path))
+
+    assert isinstance(second.values, np.memmap)
+    assert second.values.flags["F_CONTIGUOUS"]  # Each sample is one contiguous block of the file
+    assert np.array_equal(first.values, second.values, equal_nan=True)
+    assert second.samples == ["control", "treated"]
+    assert not list(tmp_path.glob("*.tmp"))  # No temporary files are left behind
+
+
+def test_to_kegg(tmp_path):
+    """
+    Test that table rows are joined to KEGG IDs, skipping unknown genes and missing values.
+    """
+    table_path = tmp_path / "expression.csv"
+    table_path.write_text(CSV_TABLE)
+    table = ExpressionTable.from_file(str(table_path))
+
+    assert table.to_kegg("hsa") == {"hsa:7157": 1.5}
+    assert table.to_kegg("hsa", "treated") == {"hsa:7157": -2.0, "hsa:672": 0.5}
+    with pytest.raises(ValueError):
+        table.to_kegg("hsa", "missing")
+
+
+def test_color_genes(mocker, tmp_path):
+    """
+    Test that gene boxes from the KGML are colored on the saved pathway image.
+    """
+    image_path = tmp_path / "hsa04115.png"
+    Image.new("RGB", (100, 100), "white").save(image_path)
+
+    mock_response = mocker.Mock()
+    mock_response.status_code = 200
+    mock_response.content = (
+        b'<pathway name="path:hsa04115">'
+        b'<entry id="1" name="hsa:7157" type="gene"><graphics x="25" y="25" width="20" height="10"/></entry>'
+        b'<entry id="2" name="hsa:672" type="gene"><graphics x="75" y="75" width="20" height="10"/></entry>'
+        b'</pathway>'
+    )
+    mocker.patch("backend.requests.get", return_value=mock_response)
+    mocker.patch("backend.time.sleep")
+
+    PathwayGenerator().color_genes("hsa04115", str(image_path), {"hsa:7157": 2.0, "hsa:672": -1.0})
+
+    image = Image.open(image_path).convert("RGB")
+    red, green, blue = image.getpixel((25, 25))
+    assert red > green and red > blue  # Up-regulated gene is drawn red
+    red, green, blue = image.getpixel((75, 75))
+    assert blue > red  # Down-regulated gene is drawn blue
+    assert image.getpixel((5, 5)) == (255, 255, 255)  # Background is untouched
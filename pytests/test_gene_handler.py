@@ -65,3 +65,38 @@ def test_get_pathway_ids(mocker, gene_handler):
     backend_requests_get = mocker.spy("backend.requests.get")
     for kegg_id in KEGG_IDS.values():
         backend_requests_get.assert_any_call(f"http://rest.kegg.jp/get/{kegg_id}")
+
+
+def test_tables_are_loaded_on_a_cache_miss(mock_kegg, gene_handler):
+    """
+    Test that without a warm-up the bulk symbol index and link table are downloaded instead of one request per gene.
+    """
+    tables = {
+        "list/hsa": "hsa:101\tCDS\t1:1..100\tBRCA1; BRCA1 DNA repair associated\n"
+                    "hsa:102\tCDS\t1:1..100\tTP53; tumor protein p53\n",
+        "link/pathway/hsa": "hsa:101\tpath:hsa04110\nhsa:101\tpath:hsa04115\nhsa:102\tpath:hsa05210\n",
+    }
+    mock_get = mock_kegg(tables)
+
+    assert gene_handler.get_kegg_ids() == KEGG_IDS
+    assert gene_handler.get_pathway_ids(KEGG_IDS.values()) == {
+        "hsa:101": ["hsa04110", "hsa04115"], "hsa:102": ["hsa05210"]
+    }
+    assert mock_get.call_count == 2  # One bulk download per table
+
+
+def test_unavailable_table_falls_back_to_single_requests(mocker, gene_handler):
+    """
+    Test that genes are still looked up one by one when KEGG does not serve the bulk table.
+    """
+    def fake_get(url):
+        response = mocker.Mock()
+        gene = url.rsplit("/", 1)[-1]
+        response.status_code = 200 if "/find/genes/" in url else 404
+        response.text = f"hsa:{KEGG_IDS[gene].split(':')[1]}\t{gene} description\n" if gene in KEGG_IDS else ""
+        return response
+
+    mocker.patch("backend.requests.get", side_effect=fake_get)
+    mocker.patch("backend.time.sleep")
+
+    assert gene_handler.get_kegg_ids() == KEGG_IDS
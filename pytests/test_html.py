@@ -1,9 +1,33 @@
+import io
+import os
 import pytest
-from app import app
+from PIL import Image
+import app as kegg_app
+from backend import ImageDerivatives, ProgressTracker
 
 @pytest.fixture
-def client():
-    """Provides a test client for the Flask app"""
+def started_jobs():
+    """Collects the jobs the app would have started, as (job function, arguments) pairs"""
+    return []
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path, started_jobs):
+    """Provides a test client for the Flask app that writes to a temporary folder and starts no real jobs"""
+    output_folder = str(tmp_path / "output")
+    monkeypatch.setattr(kegg_app, "output_folder", output_folder)
+    monkeypatch.setattr(kegg_app, "uploads_folder", str(tmp_path / "uploads"))
+    monkeypatch.setattr(kegg_app, "cache_folder", str(tmp_path / "cache"))
+    monkeypatch.setattr(kegg_app, "image_derivatives", ImageDerivatives(output_folder))
+    monkeypatch.setattr(kegg_app, "jobs", {})
+
+    def fake_start_job(target, *args, job_id=None):
+        started_jobs.append((target, args))
+        return job_id or "test-job"
+
+    monkeypatch.setattr(kegg_app, "start_job", fake_start_job)
+
+    app = kegg_app.create_app(warm_up="off")
     app.config['TESTING'] = True
     with app.test_client() as client:
         yield client
@@ -128,7 +152,7 @@ def test_kegg_tool_page(client):
         assert option in response.data, f"Missing species option: {option}"
 
 
-def test_kegg_tool_form_submission(client):
+def test_kegg_tool_form_submission(client, started_jobs):
     """Sends example POST requests to the KEGG form and checks for feedback messages"""
     test_cases = [
         {'species': 'hsa', 'genes': 'BRCA1, TP53'},
@@ -144,6 +168,60 @@ def test_kegg_tool_form_submission(client):
         # Ensure either success or error feedback is shown
         assert (b"alert alert-success" in response.data) or (b"alert alert-danger" in response.data)
 
+    # Every submission starts a gene job for its own species
+    assert [(target, args[1]) for target, args in started_jobs] == [
+        (kegg_app.run_gene_job, 'hsa'), (kegg_app.run_gene_job, 'mmu')
+    ]
+
+
+def test_every_job_gets_its_own_folder(monkeypatch, tmp_path):
+    """Checks that the real start_job gives every job a new identifier, folder and tracker"""
+    monkeypatch.setattr(kegg_app, "output_folder", str(tmp_path))
+    monkeypatch.setattr(kegg_app, "jobs", {})
+
+    def noop(tracker, job_folder):
+        tracker.emit("done", message="finished")
+
+    job_ids = [
+        kegg_app.start_job(noop, job_id="first"),
+        kegg_app.start_job(noop, job_id="second"),
+        kegg_app.start_job(noop),
+        kegg_app.start_job(noop),
+    ]
+
+    assert job_ids[:2] == ["first", "second"]
+    assert len(set(job_ids)) == 4
+    assert sorted(kegg_app.jobs) == sorted(job_ids)
+    assert sorted(os.listdir(tmp_path)) == sorted(job_ids)
+
+
+def test_gene_job_loads_pathway_names(mock_kegg, mocker, tmp_path):
+    """Checks that pathway names are written even when warm-up did not load them"""
+    mock_kegg({
+        "list/hsa": "hsa:7157\tCDS\t17:1..100\tTP53; tumor protein p53\n",
+        "link/pathway/hsa": "hsa:7157\tpath:hsa04110\n",
+        "list/pathway/hsa": "path:hsa04110\tCell cycle - Homo sapiens (human)\n",
+    })
+    mocker.patch("app.PathwayGenerator.save_pathways", return_value=[])
+    tracker = ProgressTracker("names-test")
+
+    kegg_app.run_gene_job(tracker, str(tmp_path), ["TP53"], "hsa", [])
+
+    assert tracker.events[-1]["stage"] == "done"
+    assert (tmp_path / "pathways.tsv").read_text().splitlines()[1] == "hsa:7157\thsa04110\tCell cycle - Homo sapiens (human)"
+
+
+def test_uploads_are_kept_per_job(client, started_jobs):
+    """Checks that two uploads with the same file name are saved apart instead of overwriting each other"""
+    for values in ("gene\tcontrol\nTP53\t1.0\n", "gene\tcontrol\nBRCA1\t2.0\n"):
+        data = {'species': 'hsa', 'expression_file': (io.BytesIO(values.encode()), 'expression.tsv')}
+        client.post('/kegg_tool', data=data, content_type='multipart/form-data')
+
+    first_path, second_path = [args[0] for _, args in started_jobs]
+    assert first_path != second_path
+    assert open(first_path).read().endswith("TP53\t1.0\n")
+    assert open(second_path).read().endswith("BRCA1\t2.0\n")
+
 
 def test_page_titles(client):
     """Verifies that each page contains the correct <title> tag text"""
@@ -158,3 +236,58 @@ def test_page_titles(client):
         response = client.get(path)
         # Look for the expected title text inside the page HTML
         assert title in response.data, f"Missing title {title} on {path}"
+
+
+def test_progress_stream(client):
+    """Checks that job progress is streamed as Server-Sent Events and unknown jobs give a 404"""
+    tracker = ProgressTracker("stream-test")
+    tracker.emit("genes", completed=1, total=1, mapped=1)
+    tracker.emit("done", message="Pathway maps generated successfully")
+    kegg_app.jobs["stream-test"] = tracker
+
+    response = client.get('/progress/stream-test')
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert b"event: genes\ndata: " in response.data
+    assert b"event: done\ndata: " in response.data
+
+    assert client.get('/progress/unknown').status_code == 404
+
+
+def test_download_unknown_job(client):
+    """Checks that downloading the results of a job that does not exist gives a 404"""
+    response = client.get('/download/unknown')
+
+    assert response.status_code == 404
+
+
+def test_thumbnail_caching_headers(client):
+    """Checks that thumbnails are created on request and served with caching headers"""
+    job_folder = os.path.join(kegg_app.output_folder, "thumbnail-test")
+    os.makedirs(job_folder, exist_ok=True)
+    Image.new("RGB", (1200, 600), "white").save(os.path.join(job_folder, "hsa04110.png"))
+
+    response = client.get('/thumbnail/thumbnail-test/thumb/hsa04110.png')
+    assert response.status_code == 200
+    assert response.mimetype == "image/png"
+    assert "max-age=86400" in response.headers["Cache-Control"]
+
+    # A repeated request with the ETag is answered without a body
+    cached = client.get('/thumbnail/thumbnail-test/thumb/hsa04110.png',
+                        headers={"If-None-Match": response.headers["ETag"]})
+    assert cached.status_code == 304
+
+    assert client.get('/thumbnail/thumbnail-test/huge/hsa04110.png').status_code == 404
+    assert b"hsa04110.png" in client.get('/pathway').data
+
+
+def test_reaction_query_needs_no_species(client, started_jobs):
+    """Checks that a compound, enzyme or KO lookup starts a job without a species being chosen"""
+    response = client.post('/kegg_tool', data={'species': '', 'identifiers': 'C00031, 2.7.1.1'})
+
+    assert response.status_code == 200
+    assert b"alert alert-success" in response.data
+    assert b"/progress/" in response.data
+    # The job is stubbed, so no request reaches KEGG
+    assert started_jobs == [(kegg_app.run_reaction_job, (['C00031', '2.7.1.1'],))]
@@ -0,0 +1,65 @@
+import os
+import pytest
+from PIL import Image
+from backend import ImageDerivatives  # Import the ImageDerivatives class from backend.py
+
+
+@pytest.fixture
+def pathway_image(tmp_path):
+    """
+    Pytest fixture that saves a large pathway map in a job folder.
+    """
+    job_folder = tmp_path / "job"
+    job_folder.mkdir()
+    image_path = job_folder / "hsa04110.png"
+    Image.new("RGB", (2000, 1000), "white").save(image_path)
+    return image_path
+
+
+def test_get_creates_scaled_derivative(tmp_path, pathway_image):
+    """
+    Test that a derivative is created next to the original, scaled to the configured width.
+    """
+    derived_path = ImageDerivatives(str(tmp_path)).get(str(pathway_image), "thumb")
+
+    assert derived_path == str(pathway_image.parent / "_derived" / "hsa04110.thumb.png")
+    with Image.open(derived_path) as image:
+        assert image.size == (240, 120)
+    assert os.listdir(os.path.dirname(derived_path)) == ["hsa04110.thumb.png"]  # No temporary file is left
+
+
+def test_get_reuses_cached_derivative(tmp_path, pathway_image):
+    """
+    Test that an up-to-date derivative is served from the cache instead of being recreated.
+    """
+    derivatives = ImageDerivatives(str(tmp_path))
+    derived_path = derivatives.get(str(pathway_image), "medium")
+    os.utime(derived_path, (0, os.path.getmtime(pathway_image) + 10))
+    created = os.stat(derived_path).st_ino
+
+    assert derivatives.get(str(pathway_image), "medium") == derived_path
+    assert os.stat(derived_path).st_ino == created
+
+
+def test_unknown_size(tmp_path, pathway_image):
+    """
+    Test that an unknown size raises a ValueError.
+    """
+    with pytest.raises(ValueError):
+        ImageDerivatives(str(tmp_path)).get(str(pathway_image), "huge")
+
+
+def test_evict_removes_least_recently_used(tmp_path, pathway_image):
+    """
+    Test that eviction removes the oldest derivatives once the cache exceeds its budget.
+    """
+    derivatives = ImageDerivatives(str(tmp_path))
+    thumb_path = derivatives.get(str(pathway_image), "thumb")
+    medium_path = derivatives.get(str(pathway_image), "medium")
+    os.utime(thumb_path, (1, os.path.getmtime(thumb_path)))  # The thumbnail was used longest ago
+
+    derivatives.max_cache_bytes = os.path.getsize(medium_path)
+    derivatives.evict()
+
+    assert not os.path.exists(thumb_path)
+    assert os.path.exists(medium_path)
@@ -0,0 +1,43 @@
+import io
+import zipfile
+import pytest
+from backend import JobArchive  # Import the JobArchive class from backend.py
+
+
+@pytest.fixture
+def job_folder(tmp_path):
+    """
+    Pytest fixture that creates a job folder with two pathway maps, the result tables and job bookkeeping.
+    """
+    (tmp_path / "hsa04110.png").write_bytes(b"\x89PNG" + bytes(range(256)) * 800)
+    (tmp_path / "hsa04115.png").write_bytes(b"\x89PNG small map")
+    (tmp_path / "gene_to_kegg.tsv").write_text("gene\tkegg_id\tspecies\nTP53\thsa:7157\thsa\n")
+    (tmp_path / "pathways.tsv").write_text("kegg_id\tpathway_id\nhsa:7157\thsa04110\n")
+    (tmp_path / "progress.jsonl").write_text('{"stage": "done"}\n')  # Bookkeeping files are not exported
+    (tmp_path / "hsa05200_error.txt").write_text("Could not download the map\n")
+    (tmp_path / "_derived").mkdir()  # Sub folders are not exported
+    return tmp_path
+
+
+def test_archive_contains_maps_and_tables(job_folder):
+    """
+    Test that the streamed archive holds the maps and result tables only, with PNG entries stored uncompressed.
+    """
+    data = b"".join(JobArchive(str(job_folder)).iter_chunks())
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        assert sorted(archive.namelist()) == ["gene_to_kegg.tsv", "hsa04110.png", "hsa04115.png", "pathways.tsv"]
+        assert archive.getinfo("hsa04110.png").compress_type == zipfile.ZIP_STORED
+        assert archive.getinfo("pathways.tsv").compress_type == zipfile.ZIP_DEFLATED
+        assert archive.read("hsa04110.png") == (job_folder / "hsa04110.png").read_bytes()
+
+
+def test_archive_is_streamed_in_chunks(job_folder):
+    """
+    Test that large files are split over several chunks instead of one archive-sized blob.
+    """
+    chunks = list(JobArchive(str(job_folder)).iter_chunks(chunk_size=4096))
+
+    assert len(chunks) > 10
+    assert max(len(chunk) for chunk in chunks) < 8192
@@ -0,0 +1,106 @@
+import threading
+import pytest
+from backend import GeneHandler, KeggTables  # Import the table cache classes from backend.py
+
+# Simulated bulk KEGG tables, keyed by REST operation
+TABLES = {
+    "list/hsa": "hsa:7157\tCDS\t17:complement(7661779..7687538)\tTP53, LFS1; tumor protein p53\n",
+    "link/pathway/hsa": "hsa:7157\tpath:hsa04110\nhsa:7157\tpath:hsa04115\n",
+    "list/pathway/hsa": "path:hsa04110\tCell cycle - Homo sapiens (human)\n",
+}
+
+
+@pytest.fixture(autouse=True)
+def cache_folder(monkeypatch, tmp_path):
+    """
+    Pytest fixture that points the disk cache at a temporary folder.
+    """
+    monkeypatch.setattr(KeggTables, "cache_folder", str(tmp_path))
+    return tmp_path
+
+
+def test_downloaded_tables_are_cached_on_disk(mock_kegg, cache_folder):
+    """
+    Test that a downloaded table is written to the disk cache and read back by a new process.
+    """
+    mock_get = mock_kegg(TABLES)
+
+    KeggTables().get_pathway_names("hsa")
+    assert (cache_folder / "kegg_list_pathway_hsa.tsv").read_text() == TABLES["list/pathway/hsa"]
+
+    KeggTables._indexes.clear()  # Simulate a fresh worker process
+    assert KeggTables().get_pathway_names("hsa") == {"hsa04110": "Cell cycle - Homo sapiens (human)"}
+    assert mock_get.call_count == 1
+    assert not list(cache_folder.glob("*.tmp"))  # No temporary files are left behind
+
+
+def test_preload_from_cache_only(mock_kegg, cache_folder):
+    """
+    Test that preloading without downloads only loads tables that are already cached.
+    """
+    mock_get = mock_kegg(TABLES)
+
+    (cache_folder / "kegg_list_hsa.tsv").write_text(TABLES["list/hsa"])
+
+    loaded = KeggTables().preload(["hsa", "mmu"], download=False)
+
+    assert loaded == ["list/hsa"]
+    assert KeggTables().peek("list", "hsa") == {"TP53": "hsa:7157", "LFS1": "hsa:7157"}
+    assert KeggTables().peek("link", "pathway", "hsa", False) is None
+    mock_get.assert_not_called()
+
+
+def test_preload_downloads_missing_tables(mock_kegg):
+    """
+    Test that preloading with downloads loads every table KEGG serves and skips the rest.
+    """
+    mock_kegg(TABLES)
+
+    loaded = KeggTables().preload(["hsa", "mmu"])
+
+    assert loaded == ["list/hsa", "link/pathway/hsa", "list/pathway/hsa"]
+
+
+def test_gene_handler_uses_preloaded_tables(mock_kegg):
+    """
+    Test that GeneHandler answers from preloaded tables without per-gene requests.
+    """
+    mock_get = mock_kegg(TABLES)
+
+    KeggTables().preload(["hsa"])
+    mock_get.reset_mock()
+
+    gene_handler = GeneHandler(["tp53"], "hsa")
+    gene_to_kegg = gene_handler.get_kegg_ids()
+    kegg_to_pathways = gene_handler.get_pathway_ids(gene_to_kegg.values())
+
+    assert gene_to_kegg == {"tp53": "hsa:7157"}
+    assert kegg_to_pathways == {"hsa:7157": ["hsa04110", "hsa04115"]}
+    mock_get.assert_not_called()
+
+
+def test_slow_download_does_not_block_other_tables():
+    """
+    Test that a table that is still downloading does not hold up lookups of other tables.
+    """
+    KeggTables._indexes[("list", "hsa")] = {"TP53": "hsa:7157"}
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_build():
+        started.set()
+        release.wait(5)
+        return {"TRP53": "mmu:22059"}
+
+    download = threading.Thread(target=KeggTables()._cached, args=(("list", "mmu"), slow_build))
+    download.start()
+    started.wait(5)
+    try:
+        # A loaded table and a new table of another key are both served during the download
+        assert KeggTables().get_symbol_index("hsa") == {"TP53": "hsa:7157"}
+        assert KeggTables()._cached(("list", "rno"), lambda: {"TP53": "rno:24842"}) == {"TP53": "rno:24842"}
+        assert download.is_alive()
+    finally:
+        release.set()
+        download.join()
+    assert KeggTables().peek("list", "mmu") == {"TRP53": "mmu:22059"}
@@ -0,0 +1,79 @@
+import pytest
+from backend import KeggTables, OrthologyMapper  # Import the orthology classes from backend.py
+
+# Simulated bulk KEGG tables, keyed by REST operation
+TABLES = {
+    "list/hsa": "hsa:7157\tCDS\t17:complement(7661779..7687538)\tTP53, BCC7, LFS1; tumor protein p53\n"
+                "hsa:672\tCDS\t17:complement(43044295..43125483)\tBRCA1, RNF53; BRCA1 DNA repair associated\n",
+    "link/ko/hsa": "hsa:7157\tko:K04451\nhsa:672\tko:K10605\n",
+    "link/ko/mmu": "mmu:22059\tko:K04451\nmmu:12189\tko:K10605\n",
+    "link/ko/rno": "rno:24842\tko:K04451\n",
+    "link/pathway/hsa": "hsa:7157\tpath:hsa04115\n",
+    "link/pathway/mmu": "mmu:22059\tpath:mmu04115\nmmu:12189\tpath:mmu03440\n",
+}
+
+
+def test_symbol_index_prefers_primary_symbol(mock_kegg):
+    """
+    Test that the bulk symbol index maps primary symbols and aliases to KEGG IDs.
+    """
+    mock_kegg(TABLES)
+
+    index = KeggTables().get_symbol_index("hsa")
+
+    assert index["TP53"] == "hsa:7157"
+    assert index["LFS1"] == "hsa:7157"
+    assert index["BRCA1"] == "hsa:672"
+
+
+def test_map_orthologs(mock_kegg):
+    """
+    Test that a gene list is mapped to KO identifiers and orthologs in every target species.
+    """
+    mock_kegg(TABLES)
+
+    mapper = OrthologyMapper(["tp53", "BRCA1", "UNKNOWN"], "hsa", ["mmu", "rno"])
+    result = mapper.map_orthologs()
+
+    assert result == {
+        "tp53": {"kegg_id": "hsa:7157", "ko": ["ko:K04451"],
+                 "orthologs": {"mmu": ["mmu:22059"], "rno": ["rno:24842"]}},
+        "BRCA1": {"kegg_id": "hsa:672", "ko": ["ko:K10605"],
+                  "orthologs": {"mmu": ["mmu:12189"], "rno": []}},
+    }
+
+
+def test_tables_are_downloaded_once(mock_kegg):
+    """
+    Test that bulk tables are shared between mappers and only downloaded once.
+    """
+    mock_get = mock_kegg(TABLES)
+
+    OrthologyMapper(["TP53"], "hsa", ["mmu"]).map_orthologs()
+    OrthologyMapper(["BRCA1"], "hsa", ["mmu"]).map_orthologs()
+
+    # list/hsa, link/ko/hsa and link/ko/mmu are each fetched a single time
+    assert mock_get.call_count == 3
+
+
+def test_pathways_of_orthologs_use_bulk_tables(mock_kegg):
+    """
+    Test that pathways of source genes and orthologs come from one bulk link table per species.
+    """
+    mock_get = mock_kegg(TABLES)
+
+    mapper = OrthologyMapper(["TP53"], "hsa", ["mmu"])
+    result = mapper.get_pathway_ids(["hsa:7157", "mmu:22059", "mmu:12189"])
+
+    assert result == {"hsa:7157": ["hsa04115"], "mmu:22059": ["mmu04115"], "mmu:12189": ["mmu03440"]}
+    assert mock_get.call_count == 2  # link/pathway/hsa and link/pathway/mmu
+
+
+def test_missing_table_raises(mock_kegg):
+    """
+    Test that a table KEGG does not serve raises a ValueError.
+    """
+    mock_kegg(TABLES)
+
+    with pytest.raises(ValueError):
+        KeggTables().get_links("ko", "xyz")
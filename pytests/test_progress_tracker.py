@@ -0,0 +1,107 @@
+import pytest
+import threading
+from backend import GeneHandler, PathwayGenerator, ProgressTracker  # Import the progress classes from backend.py
+
+
+@pytest.fixture
+def tracker():
+    """
+    Pytest fixture to initialize a ProgressTracker for a test job.
+    """
+    return ProgressTracker("test-job")
+
+
+def test_emit_adds_eta(tracker):
+    """
+    Test that events with completed and total counts get an ETA, and that finishing marks the job done.
+    """
+    tracker.emit("genes", completed=1, total=4)
+    tracker.emit("done", message="finished")
+
+    assert tracker.events[0]["stage"] == "genes"
+    assert tracker.events[0]["eta"] >= 0
+    assert "eta" not in tracker.events[1]
+    assert tracker.done
+
+
+def test_iter_events_waits_for_new_events(tracker):
+    """
+    Test that iter_events replays earlier events, blocks for new ones and stops when the job is done.
+    """
+    tracker.emit("genes", completed=1, total=1)
+    threading.Timer(0.1, tracker.emit, args=("done",), kwargs={"message": "finished"}).start()
+
+    stages = [event["stage"] for event in tracker.iter_events(timeout=5) if event]
+
+    assert stages == ["genes", "done"]
+
+
+def test_iter_events_yields_keep_alive(tracker):
+    """
+    Test that iter_events yields None when no event arrives within the timeout.
+    """
+    events = tracker.iter_events(timeout=0.01)
+
+    assert next(events) is None
+
+
+def test_gene_handler_reports_progress(mocker, tracker):
+    """
+    Test that GeneHandler emits one 'genes' event per gene.
+    """
+    mock_response = mocker.Mock()
+    mock_response.status_code = 200
+    mock_response.text = "hsa:7157\tTP53 description\n"
+    mocker.patch("backend.requests.get", return_value=mock_response)
+    mocker.patch("backend.time.sleep")
+
+    GeneHandler(["TP53", "BRCA1"], "hsa", progress=tracker).get_kegg_ids()
+
+    assert [(event["stage"], event["completed"], event["total"]) for event in tracker.events] == [
+        ("genes", 1, 2), ("genes", 2, 2)
+    ]
+
+
+def test_save_pathways_reports_each_image(mocker, tracker, tmp_path):
+    """
+    Test that PathwayGenerator emits an 'images' event with the file name of every saved map.
+    """
+    mock_response = mocker.Mock()
+    mock_response.status_code = 200
+    mock_response.headers = {"Content-Type": "image/png"}
+    mock_response.iter_content = lambda chunk_size: [b"testimagechunk"]
+    mocker.patch("backend.requests.get", return_value=mock_response)
+    mocker.patch("backend.time.sleep")
+
+    saved = PathwayGenerator(progress=tracker).save_pathways(
+        {"hsa04110": ["hsa:7157"], "hsa04115": ["hsa:7157"]}, str(tmp_path)
+    )
+
+    assert saved == ["hsa04110.png", "hsa04115.png"]
+    assert [event["file"] for event in tracker.events] == ["hsa04110.png", "hsa04115.png"]
+
+
+def test_follow_reads_events_from_log(tmp_path):
+    """
+    Test that events written to the log by one tracker can be followed from another process.
+    """
+    log_path = str(tmp_path / "progress.jsonl")
+    tracker = ProgressTracker("test-job", log_path=log_path)
+    tracker.emit("genes", completed=1, total=2)
+    threading.Timer(0.1, tracker.emit, args=("done",), kwargs={"message": "finished"}).start()
+
+    stages = [event["stage"] for event in ProgressTracker.follow(log_path, poll_interval=0.01) if event]
+
+    assert stages == ["genes", "done"]
+
+
+def test_follow_gives_up_on_a_silent_job(tmp_path):
+    """
+    Test that following a log without a done or error event ends with an error after the idle limit.
+    """
+    log_path = str(tmp_path / "progress.jsonl")
+    ProgressTracker("test-job", log_path=log_path).emit("genes", completed=1, total=2)
+
+    events = [event for event in ProgressTracker.follow(log_path, poll_interval=0.01, max_idle=0.1) if event]
+
+    assert [event["stage"] for event in events] == ["genes", "error"]
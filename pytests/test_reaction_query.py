@@ -0,0 +1,55 @@
+from backend import ReactionQuery  # Import the ReactionQuery class from backend.py
+
+# Simulated bulk KEGG link tables, keyed by REST operation
+TABLES = {
+    "link/reaction/compound": "cpd:C00031\trn:R00299\ncpd:C00031\trn:R01786\ncpd:C00267\trn:R00299\n",
+    "link/reaction/enzyme": "ec:2.7.1.1\trn:R00299\nec:2.7.1.1\trn:R01786\n",
+    "link/reaction/ko": "ko:K00844\trn:R00299\n",
+    "link/pathway/reaction": "rn:R00299\tpath:rn00010\nrn:R00299\tpath:map00010\nrn:R00299\tpath:map00052\n",
+}
+
+
+def test_identifiers_are_recognized():
+    """
+    Test that compound, EC and KO identifiers are normalized and everything else is set aside.
+    """
+    query = ReactionQuery(["C00031", "cpd:C00267", "2.7.1.1", "ec:1.1.1.n2", "k00844", "TP53", "C0003"])
+
+    assert query.identifiers == {
+        "C00031": "cpd:C00031",
+        "cpd:C00267": "cpd:C00267",
+        "2.7.1.1": "ec:2.7.1.1",
+        "ec:1.1.1.n2": "ec:1.1.1.n2",
+        "k00844": "ko:K00844",
+    }
+    assert query.unrecognized == ["TP53", "C0003"]
+
+
+def test_resolve(mock_kegg):
+    """
+    Test that identifiers are resolved to reactions and to the reference pathways of those reactions.
+    """
+    mock_kegg(TABLES)
+
+    result = ReactionQuery(["C00031", "2.7.1.1", "K00844"]).resolve()
+
+    assert result["C00031"] == {
+        "kegg_id": "cpd:C00031",
+        "reactions": ["rn:R00299", "rn:R01786"],
+        "pathways": {"rn:R00299": ["map00010", "map00052"], "rn:R01786": []},
+    }
+    assert result["2.7.1.1"]["reactions"] == ["rn:R00299", "rn:R01786"]
+    assert result["K00844"]["pathways"] == {"rn:R00299": ["map00010", "map00052"]}
+
+
+def test_each_link_table_is_downloaded_once(mock_kegg):
+    """
+    Test that every hop is an in-memory join on a table that is downloaded a single time.
+    """
+    mock_get = mock_kegg(TABLES)
+
+    ReactionQuery(["C00031", "C00267"]).resolve()
+    ReactionQuery(["C00267"]).resolve()
+
+    # link/reaction/compound and link/pathway/reaction are each fetched a single time
+    assert mock_get.call_count == 2